@@ -1,5 +1,7 @@
 import streamlit as st
-from groq_client import get_ai_response
+from groq_client import get_ai_response_streaming
+from ui_components import write_ai_stream
+from request_scheduler import AIError
 
 def display_ai_chat(client):
     """Display the AI chat tab with enhanced math display"""
@@ -74,9 +76,10 @@ def display_ai_chat(client):
             st.markdown(prompt)
         
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = get_ai_response(client, prompt)
-                st.markdown(response)
+            # Tokens render as they arrive instead of after the whole answer
+            response = write_ai_stream(get_ai_response_streaming(client, prompt))
+            # Failed requests are shown once but not kept in the conversation
+            if not isinstance(response, AIError):
                 st.session_state.messages.append({"role": "assistant", "content": response})
     
     # Clear chat button
@@ -2,6 +2,7 @@ import streamlit as st
 import hashlib
 import sqlite3
 import os
+from notes_database import NoteIndex
 
 class AuthManager:
     def __init__(self, db_path='users.db'):
@@ -120,6 +121,15 @@ def logout():
     """
     Clear session state and log out the user
     """
+    # Commit any pending note edits before dropping the user's notes
+    if 'notes_db' in st.session_state:
+        # The database and its writer are shared with the user's other sessions, so only flush
+        writer = st.session_state.notes_db.writer
+        if writer is not None:
+            writer.flush()
+        del st.session_state.notes_db
+    st.session_state.notes = NoteIndex()
+    st.session_state.current_note = None
     st.session_state.logged_in = False
     st.session_state.username = None
     st.rerun()
@@ -0,0 +1,110 @@
+import atexit
+import threading
+import time
+
+class AutoSaveWriter:
+    def __init__(self, save_batch, delay=1.0):
+        """
+        Initialize a background writer that coalesces rapid edits.
+        Edits submitted within `delay` seconds of each other are merged
+        per note and written together with a single call to `save_batch`,
+        so one commit (and one fsync) covers a whole burst of keystrokes.
+        """
+        self.save_batch = save_batch
+        self.delay = delay
+        self.pending = {}  # note_id -> latest snapshot of the note
+        self.in_flight = set()  # note IDs taken for the commit currently running
+        self.saved_at = {}  # note_id -> timestamp of the last landed commit
+        self.last_error = None
+        self.condition = threading.Condition()
+        self.commit_lock = threading.Lock()  # keeps commits in submission order
+        self.first_pending_at = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="notes-autosave", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, note):
+        """Queue a note to be saved, replacing any pending version of it"""
+        with self.condition:
+            self.pending[note["id"]] = dict(note)
+            if self.first_pending_at is None:
+                self.first_pending_at = time.monotonic()
+            self.condition.notify()
+
+    def is_pending(self, note_id):
+        """Return True if the note has edits that haven't been committed yet"""
+        with self.condition:
+            return note_id in self.pending or note_id in self.in_flight
+
+    def last_saved(self, note_id):
+        """Return when the note's last commit landed, or None if it hasn't been saved"""
+        with self.condition:
+            return self.saved_at.get(note_id)
+
+    def flush(self):
+        """Commit every pending edit now, from the calling thread"""
+        with self.commit_lock:
+            with self.condition:
+                batch = self._take_batch()
+            self._commit(batch)
+
+    def close(self):
+        """Flush pending edits and stop the background thread"""
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        self.flush()
+        atexit.unregister(self.close)
+
+    def _take_batch(self):
+        """Remove and return all pending notes; caller must hold the condition"""
+        batch = list(self.pending.values())
+        self.in_flight.update(self.pending)
+        self.pending = {}
+        self.first_pending_at = None
+        return batch
+
+    def _commit(self, batch):
+        """Write a batch of notes and record when the commit landed"""
+        if not batch:
+            return
+        try:
+            self.save_batch(batch)
+        except Exception as e:
+            # Put the notes back so the next batch retries them, unless newer edits arrived
+            with self.condition:
+                self.last_error = e
+                for note in batch:
+                    self.in_flight.discard(note["id"])
+                    self.pending.setdefault(note["id"], note)
+                if self.first_pending_at is None:
+                    self.first_pending_at = time.monotonic()
+            return
+
+        committed_at = time.time()
+        with self.condition:
+            self.last_error = None
+            for note in batch:
+                self.in_flight.discard(note["id"])
+                self.saved_at[note["id"]] = committed_at
+
+    def _run(self):
+        """Background loop that commits coalesced batches once the window closes"""
+        while True:
+            with self.condition:
+                while not self.closed and self.first_pending_at is None:
+                    self.condition.wait()
+                if self.closed:
+                    return
+
+                # Let more edits pile up until the coalescing window closes
+                remaining = self.first_pending_at + self.delay - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+
+            self.flush()
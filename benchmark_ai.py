@@ -0,0 +1,167 @@
+"""
+Latency and throughput benchmarks for the AI code paths, run against the
+local Groq stand-in (or any GROQ_BASE_URL) so they work offline.
+
+    python benchmark_ai.py --requests 40 --concurrency 8
+    python benchmark_ai.py --latency 0.5 --error-rate 0.05 --scenarios chat,streaming
+    python benchmark_ai.py --mode replay --cassette cassettes/session.jsonl
+"""
+import argparse
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from mock_groq_server import MockConfig, start_mock_server
+
+SAMPLE_NOTES = """# Photosynthesis
+
+Photosynthesis converts light energy into chemical energy stored in glucose.
+It takes place in the chloroplasts, mainly in the leaves.
+
+## Light-dependent reactions
+
+Water is split, oxygen is released, and ATP and NADPH are produced.
+
+## Calvin cycle
+
+Carbon dioxide is fixed into sugars using the ATP and NADPH.
+"""
+
+def _unique(text):
+    """Make a prompt unique so the response cache and request coalescing don't hide latency"""
+    return f"{text}\n\n(benchmark run {uuid.uuid4().hex[:8]})"
+
+def build_scenarios(groq_client):
+    """Return {name: callable} for each benchmarked code path; each call returns (ok, ttft)"""
+    from request_scheduler import AIError
+    client = groq_client.get_groq_client()
+
+    def chat():
+        response = groq_client.get_ai_response(client, _unique("Explain the Calvin cycle."), use_cache=False)
+        return not isinstance(response, AIError), None
+
+    def streaming():
+        start = time.perf_counter()
+        ttft = None
+        ok = True
+        for chunk in groq_client.get_ai_response_streaming(client, _unique("Explain photosynthesis."), use_cache=False):
+            if isinstance(chunk, AIError):
+                ok = False
+            elif ttft is None:
+                ttft = time.perf_counter() - start
+        return ok, ttft
+
+    scenarios = {"chat": chat, "streaming": streaming}
+
+    try:
+        from exam_module import generate_exam_from_notes, generate_exam_from_notes_streaming
+    except Exception as e:
+        print(f"Skipping exam scenario: exam_module could not be imported ({e})")
+    else:
+        def exam():
+            questions = generate_exam_from_notes(client, _unique(SAMPLE_NOTES), num_questions=5)
+            return not isinstance(questions, AIError) and "error" not in questions[0], None
+        scenarios["exam"] = exam
+
+        def exam_streaming():
+            # ttft here is the time to the first complete question
+            start = time.perf_counter()
+            ttft = None
+            questions = 0
+            for item in generate_exam_from_notes_streaming(client, _unique(SAMPLE_NOTES), num_questions=5):
+                if isinstance(item, AIError):
+                    return False, ttft
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                questions += 1
+            return questions > 0, ttft
+        scenarios["exam_streaming"] = exam_streaming
+
+    import study_materials
+    for name in ("generate_flashcards", "generate_study_guide", "generate_mind_map", "generate_diagram"):
+        generator = getattr(study_materials, name)
+
+        def study_material(generator=generator):
+            return not isinstance(generator(client, _unique(SAMPLE_NOTES)), AIError), None
+        scenarios[name.replace("generate_", "")] = study_material
+
+    return scenarios
+
+def run_scenario(call, requests, concurrency):
+    """Run a scenario `requests` times on `concurrency` threads; returns its measurements"""
+    latencies = []
+    ttfts = []
+    errors = 0
+
+    def timed():
+        start = time.perf_counter()
+        ok, ttft = call()
+        return time.perf_counter() - start, ok, ttft
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, ok, ttft in pool.map(lambda _: timed(), range(requests)):
+            latencies.append(latency)
+            if ttft is not None:
+                ttfts.append(ttft)
+            if not ok:
+                errors += 1
+    wall = time.perf_counter() - start
+    return {"latencies": latencies, "ttfts": ttfts, "errors": errors, "wall": wall}
+
+def report(name, result):
+    from stream_metrics import percentile
+    latencies = result["latencies"]
+    ttft = f"{percentile(result['ttfts'], 0.5) * 1000:8.0f}" if result["ttfts"] else f"{'-':>8}"
+    print(f"{name:<14}{len(latencies):>6}{result['errors']:>7}"
+          f"{percentile(latencies, 0.5) * 1000:>9.0f}{percentile(latencies, 0.95) * 1000:>9.0f}"
+          f"{ttft}{len(latencies) / result['wall']:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AI code paths against a local Groq stand-in")
+    parser.add_argument("--requests", type=int, default=20, help="calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--scenarios", help="comma-separated subset, e.g. chat,streaming,exam")
+    parser.add_argument("--base-url", help="use an already running server instead of starting one")
+    parser.add_argument("--mode", choices=("mock", "replay"), default="mock")
+    parser.add_argument("--cassette")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--chunk-interval", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--respect-rate-limits", action="store_true",
+                        help="keep the scheduler's requests/tokens per minute limits")
+    args = parser.parse_args()
+
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server = start_mock_server(MockConfig(
+            latency=args.latency, chunk_interval=args.chunk_interval, error_rate=args.error_rate,
+            retry_after=0.1, mode=args.mode, cassette=args.cassette, seed=0
+        ))
+        base_url = server.url
+
+    # The client and scheduler read their settings on import
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    if not args.respect_rate_limits:
+        os.environ["GROQ_REQUESTS_PER_MINUTE"] = "0"
+        os.environ["GROQ_TOKENS_PER_MINUTE"] = "0"
+    import groq_client
+
+    scenarios = build_scenarios(groq_client)
+    if args.scenarios:
+        wanted = args.scenarios.split(",")
+        scenarios = {name: call for name, call in scenarios.items() if name in wanted}
+
+    print(f"Benchmarking against {base_url}: {args.requests} calls per scenario, concurrency {args.concurrency}\n")
+    print(f"{'scenario':<14}{'calls':>6}{'errors':>7}{'p50 ms':>9}{'p95 ms':>9}{'ttft ms':>8}{'req/s':>10}")
+    for name, call in scenarios.items():
+        report(name, run_scenario(call, args.requests, args.concurrency))
+
+    print()
+    print("scheduler:", groq_client.get_scheduler_stats())
+    print("pool:", groq_client.get_pool_stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+import httpx
+from groq import AsyncGroq, DefaultAsyncHttpxClient, DefaultHttpxClient, Groq
+
+# Connection pool limits shared by every session in the process
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "50")),
+    max_keepalive_connections=int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "20")),
+    keepalive_expiry=float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60"))
+)
+REQUEST_TIMEOUT = httpx.Timeout(float(os.getenv("GROQ_TIMEOUT", "60")), connect=10.0)
+
+class PoolStats:
+    def __init__(self):
+        """
+        Initialize counters for the shared HTTP connection pools. Requests
+        are traced through httpcore, so new TCP connections and TLS
+        handshakes can be compared with the number of completed requests
+        to see how often kept-alive connections are reused.
+        """
+        self.counts = {"clients_created": 0, "requests": 0, "connections_opened": 0, "tls_handshakes": 0}
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def _trace_event(self, event_name):
+        if event_name == "connection.connect_tcp.complete":
+            self.count("connections_opened")
+        elif event_name == "connection.start_tls.complete":
+            self.count("tls_handshakes")
+
+    def on_request(self, request):
+        """httpx request hook for the blocking client"""
+        request.extensions["trace"] = lambda event_name, info: self._trace_event(event_name)
+
+    def on_response(self, response):
+        """httpx response hook for the blocking client"""
+        self.count("requests")
+
+    async def on_request_async(self, request):
+        """httpx request hook for the asyncio client"""
+        async def trace(event_name, info):
+            self._trace_event(event_name)
+
+        request.extensions["trace"] = trace
+
+    async def on_response_async(self, response):
+        """httpx response hook for the asyncio client"""
+        self.count("requests")
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.counts)
+        requests = stats["requests"]
+        stats["reuse_rate"] = 1 - stats["connections_opened"] / requests if requests else 0.0
+        return stats
+
+pool_stats = PoolStats()
+
+_lock = threading.Lock()
+_client = None
+_async_client = None
+_loop = None
+
+def get_groq_client():
+    """Return the process-wide Groq client, creating it on first use"""
+    global _client
+    with _lock:
+        if _client is None:
+            http_client = DefaultHttpxClient(
+                limits=POOL_LIMITS,
+                timeout=REQUEST_TIMEOUT,
+                event_hooks={"request": [pool_stats.on_request], "response": [pool_stats.on_response]}
+            )
+            # Retries are handled by the request scheduler, which knows about the rate limits
+            _client = Groq(api_key=os.getenv("GROQ_API_KEY"), http_client=http_client, max_retries=0)
+            pool_stats.count("clients_created")
+        return _client
+
+def _background_loop():
+    """Return the event loop that runs all asyncio requests, starting it on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="groq-event-loop", daemon=True).start()
+        return _loop
+
+def get_async_groq_client():
+    """
+    Return the process-wide AsyncGroq client. Its connection pool belongs to
+    the background event loop, so use it only from coroutines passed to
+    run_in_background().
+    """
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            http_client = DefaultAsyncHttpxClient(
+                limits=POOL_LIMITS,
+                timeout=REQUEST_TIMEOUT,
+                event_hooks={"request": [pool_stats.on_request_async], "response": [pool_stats.on_response_async]}
+            )
+            _async_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), http_client=http_client, max_retries=0)
+            pool_stats.count("clients_created")
+        return _async_client
+
+def run_in_background(coroutine):
+    """Schedule a coroutine on the shared event loop; returns a concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coroutine, _background_loop())
+
+def _pool_connections(client):
+    """Return the connections currently held by a client's pool (empty if unavailable)"""
+    try:
+        return list(client._client._transport._pool.connections)
+    except AttributeError:
+        return []
+
+def get_pool_stats():
+    """Return request and connection counters plus current pool occupancy"""
+    stats = pool_stats.get_stats()
+    connections = []
+    for client in (_client, _async_client):
+        if client is not None:
+            connections.extend(_pool_connections(client))
+    stats["open_connections"] = len(connections)
+    stats["idle_connections"] = sum(1 for connection in connections if connection.is_idle())
+    stats["max_connections"] = POOL_LIMITS.max_connections
+    stats["max_keepalive_connections"] = POOL_LIMITS.max_keepalive_connections
+    return stats
@@ -0,0 +1,121 @@
+import pandas as pd
+
+# Words too generic to say what a question is about
+TOPIC_STOPWORDS = frozenset({
+    "about", "after", "also", "answer", "because", "before", "best", "between", "both",
+    "called", "correct", "describe", "describes", "does", "each", "example", "explain",
+    "false", "following", "from", "have", "into", "main", "most", "other", "question",
+    "role", "statement", "than", "that", "their", "there", "these", "they", "this",
+    "those", "true", "used", "what", "when", "where", "which", "while", "with", "would"
+})
+TOPIC_PATTERN = r"[a-z]{4,}"
+
+# Accuracy is shrunk toward the overall accuracy as if each topic had this
+# many extra answers, so a topic seen twice doesn't top the weakest list
+PRIOR_ANSWERS = 5
+
+def build_exam_analytics(attempts, answers, questions):
+    """
+    Aggregate a user's exam history. `attempts` has one row per attempt
+    (exam_id, source_note_id, date_taken, percentage), `answers` one row
+    per answered question (exam_id, position, is_correct) and `questions`
+    one row per exam question (exam_id, position, question, source_note_id,
+    source_note). Notes are grouped by ID, so notes sharing a title stay
+    apart; the title is only attached as a label. Returns the small
+    aggregate frames the dashboard is drawn from, so its controls never
+    touch the per-answer rows again.
+    """
+    # Latest title of each note, for display; titles shared by several notes get the note ID
+    note_titles = questions.drop_duplicates("source_note_id", keep="last").set_index("source_note_id")["source_note"].astype(str)
+    note_ids = note_titles.index.to_series(index=note_titles.index).astype(str)
+    note_titles = note_titles.where(~note_titles.duplicated(keep=False), note_titles + " (note " + note_ids + ")")
+
+    # Per exam question on the numeric IDs, then per question text, since
+    # questions reused from the question bank appear in several exams
+    by_question = (
+        answers.groupby(["exam_id", "position"], sort=False)["is_correct"]
+        .agg(answers="size", correct="sum")
+        .reset_index()
+        .merge(questions[["exam_id", "position", "question", "source_note_id"]], on=["exam_id", "position"], how="left")
+        .groupby(["source_note_id", "question"], sort=False)[["answers", "correct"]]
+        .sum()
+        .reset_index()
+    )
+    by_question["source_note"] = by_question["source_note_id"].map(note_titles)
+    by_question["accuracy"] = by_question["correct"] / by_question["answers"]
+
+    # Per source note, weighted by how often each question was answered
+    by_note = by_question.groupby("source_note_id", sort=False)[["answers", "correct"]].sum()
+    by_note["attempts"] = attempts.groupby("source_note_id").size()
+    by_note["accuracy"] = by_note["correct"] / by_note["answers"]
+    by_note["source_note"] = note_titles
+    by_note = by_note.sort_values("accuracy").reset_index()
+
+    # Per day, so any coarser trend is a cheap resample of a short series
+    taken = pd.to_datetime(attempts["date_taken"], unit="s").dt.floor("D")
+    daily = attempts.groupby(taken)["percentage"].agg(attempts="size", score_sum="sum")
+
+    total_answers = int(by_question["answers"].sum())
+    return {
+        "summary": {
+            "attempts": len(attempts),
+            "answers": total_answers,
+            "accuracy": float(by_question["correct"].sum()) / total_answers if total_answers else 0.0,
+            "average_score": float(attempts["percentage"].mean()) if len(attempts) else 0.0
+        },
+        "by_question": by_question,
+        "by_note": by_note,
+        "daily": daily
+    }
+
+def score_trend(daily, freq="W"):
+    """Return the average score and number of attempts per period ("D", "W" or "MS")"""
+    if daily.empty:
+        return pd.DataFrame(columns=["average_score", "attempts"])
+    periods = daily.resample(freq).sum()
+    periods = periods[periods["attempts"] > 0]
+    return pd.DataFrame({
+        "average_score": periods["score_sum"] / periods["attempts"],
+        "attempts": periods["attempts"]
+    })
+
+def weakest_questions(by_question, min_answers=3, limit=10):
+    """Return the questions answered at least `min_answers` times with the lowest accuracy"""
+    answered = by_question[by_question["answers"] >= min_answers]
+    return answered.nsmallest(limit, "accuracy")[["question", "source_note", "answers", "accuracy"]]
+
+def weakest_topics(by_question, min_answers=10, limit=10):
+    """
+    Return the topic words whose questions are answered worst. Each
+    distinct question is split into its content words once, and a word's
+    accuracy pools the answers to every question containing it, shrunk
+    toward the overall accuracy by PRIOR_ANSWERS.
+    """
+    if by_question.empty:
+        return pd.DataFrame(columns=["topic", "questions", "answers", "accuracy"])
+    words = (
+        by_question["question"].fillna("").str.lower().str.findall(TOPIC_PATTERN)
+        .explode()
+        .dropna()
+    )
+    words = words[~words.isin(TOPIC_STOPWORDS)]
+    # A word repeated in one question counts once
+    pairs = pd.DataFrame({"topic": words.to_numpy(), "row": words.index.to_numpy()}).drop_duplicates()
+
+    answers = by_question["answers"].to_numpy()
+    correct = by_question["correct"].to_numpy()
+    rows = pairs["row"].to_numpy()
+    pairs["answers"] = answers[rows]
+    pairs["correct"] = correct[rows]
+
+    topics = pairs.groupby("topic").agg(
+        questions=("row", "size"), answers=("answers", "sum"), correct=("correct", "sum")
+    )
+    topics = topics[topics["answers"] >= min_answers]
+    overall = correct.sum() / answers.sum()
+    topics["accuracy"] = topics["correct"] / topics["answers"]
+    topics["smoothed"] = (topics["correct"] + PRIOR_ANSWERS * overall) / (topics["answers"] + PRIOR_ANSWERS)
+    return (
+        topics.nsmallest(limit, "smoothed")
+        .reset_index()[["topic", "questions", "answers", "accuracy"]]
+    )
@@ -3,35 +3,66 @@ from PIL import Image
 import numpy as np
 from streamlit_drawable_canvas import st_canvas
 import pandas as pd
-from groq import Groq
 from dotenv import load_dotenv
 import os
 import streamlit.components.v1 as components
 from datetime import datetime
-import json
+import time
+from notes_database import NoteIndex
+from json_stream import JSONArrayStreamParser
+from note_chunks import split_notes
+from token_budget import count_tokens
+from question_dedup import QuestionDeduper
+from question_bank import QuestionBank
+from exam_store import SQLiteExamStore
+from exam_analytics import build_exam_analytics, score_trend, weakest_questions, weakest_topics
+from ui_components import paginate
+from groq_client import PRIORITY_BULK, AIError, get_ai_response_streaming, get_groq_client, iter_ai_responses
 
 # Load environment 
 load_dotenv()
 
-def initialize_groq():
-    return Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Exam JSON for up to 20 questions needs a longer reply than the default
+EXAM_MAX_TOKENS = 4096
+# Reply budget per question, so a shard's reservation matches what it asks for
+EXAM_TOKENS_PER_QUESTION = 300
 
-def get_ai_response(client, prompt, system_message="You are a helpful AI assistant. Provide clear and accurate responses to questions."):
-    try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            model=os.getenv("GROQ_MODEL", "mixtral-8x7b-32768"),
-            temperature=float(os.getenv("AI_TEMPERATURE", "0.7")),
-        )
-        return chat_completion.choices[0].message.content
-    except Exception as e:
-        return f"Error getting AI response: {str(e)}"
+# Larger exams are split into shards of this many questions generated concurrently
+EXAM_SHARD_QUESTIONS = 5
+# Notes longer than this many tokens are split across shards too, whatever the
+# exam size, so no request has to trim its notes to fit an 8k context window
+EXAM_NOTE_TOKENS = 3000
+EXAM_SHARD_CONCURRENCY = 4
+# Extra rounds asking for the questions still missing after deduplication
+EXAM_TOP_UP_ROUNDS = 2
+
+# Generated questions are kept and reused for later exams on the same notes
+question_bank = QuestionBank(os.getenv("QUESTION_BANK_PATH", "question_bank.db"))
+
+# Exams and attempts outlive the session
+exam_store = SQLiteExamStore(os.getenv("EXAMS_DB_PATH", "exams.db"))
+# Number of attempts listed per exam history page
+EXAM_HISTORY_PAGE_SIZE = 20
+# Number of exams offered per page of the exam picker
+EXAM_LIST_PAGE_SIZE = 20
 
-def generate_exam_from_notes(client, notes_content, num_questions=5, exam_type="multiple_choice"):
-    """Generate exam questions based on the notes content"""
+# When the notes are too short to give every shard its own slice, shards
+# share the notes but each focuses on a different kind of question
+SHARD_FOCUSES = (
+    "definitions and key terms",
+    "processes and how things work",
+    "applications and worked examples",
+    "comparisons and relationships between concepts",
+    "causes, effects and reasoning",
+    "common misconceptions"
+)
+
+def _exam_request(notes_content, num_questions, exam_type, focus=None, avoid=()):
+    """
+    Return the get_ai_response keyword arguments asking for an exam as a
+    JSON array, optionally focused on one kind of question and avoiding
+    questions that have already been generated.
+    """
     system_message = f"""You are an education expert. Generate {num_questions} {exam_type} questions based on the following notes.
     For each question:
     1. Create a clear, concise question
@@ -45,63 +76,203 @@ def generate_exam_from_notes(client, notes_content, num_questions=5, exam_type="
     - answer: The correct answer
     - explanation: Brief explanation of the correct answer
     """
+    if focus:
+        system_message += f"\n    Focus the questions on {focus}.\n"
+    if avoid:
+        existing = "\n".join(f"    - {question}" for question in avoid)
+        system_message += f"\n    Do not repeat or rephrase any of these existing questions:\n{existing}\n"
     
     prompt = f"Generate an exam based on these notes:\n\n{notes_content}"
-    response = get_ai_response(client, prompt, system_message)
+    return {
+        "prompt": prompt,
+        "system_message": system_message,
+        "priority": PRIORITY_BULK,
+        "max_tokens": min(EXAM_MAX_TOKENS, 256 + EXAM_TOKENS_PER_QUESTION * num_questions),
+        # Math symbols must not be rewritten as LaTeX inside the JSON
+        "format_math": False
+    }
+
+def _shard_count(notes_content, num_questions):
+    """
+    Return how many requests an exam is generated in: enough for at most
+    EXAM_SHARD_QUESTIONS questions each, and for long notes enough to give
+    each at most EXAM_NOTE_TOKENS of the notes (but at least one question)
+    """
+    by_questions = -(-num_questions // EXAM_SHARD_QUESTIONS)
+    by_length = -(-count_tokens(notes_content) // EXAM_NOTE_TOKENS)
+    return max(by_questions, min(num_questions, by_length))
+
+def _shard_requests(notes_content, num_questions, exam_type, avoid=(), use_cache=True):
+    """
+    Split an exam into _shard_count shards, each based on its own
+    contiguous slice of the notes or, when the notes are too short to
+    slice, on the whole notes with a different focus.
+    """
+    count = _shard_count(notes_content, num_questions)
+    sizes = [num_questions // count + (1 if index < num_questions % count else 0) for index in range(count)]
+    
+    # Cut the notes finer than needed, then group the pieces into count slices of about equal length
+    chunks = split_notes(notes_content, max(1000, len(notes_content) // (4 * count) + 1))
+    total = sum(len(chunk) for chunk in chunks)
+    slices = []
+    current = []
+    done = 0
+    for chunk in chunks:
+        current.append(chunk)
+        done += len(chunk)
+        if len(slices) < count - 1 and done >= total * (len(slices) + 1) / count:
+            slices.append("\n\n".join(current))
+            current = []
+    if current:
+        slices.append("\n\n".join(current))
     
-    # Try to parse the response as JSON
+    requests = []
+    for index, size in enumerate(sizes):
+        focus = SHARD_FOCUSES[index % len(SHARD_FOCUSES)] if len(slices) < count else None
+        request = _exam_request(slices[index % len(slices)], size, exam_type, focus, avoid)
+        request["use_cache"] = use_cache
+        requests.append(request)
+    return requests
+
+def _generate_questions(client, notes_content, num_questions, exam_type, avoid=(), use_cache=True):
+    """
+    Yield questions from one round of generation as they become available:
+    a small exam on short notes streams from one request, a larger exam or
+    one on long notes is generated in concurrent shards. Failed requests
+    yield an AIError.
+    """
+    if _shard_count(notes_content, num_questions) == 1:
+        request = _exam_request(notes_content, num_questions, exam_type, avoid=avoid)
+        parser = JSONArrayStreamParser()
+        for chunk in get_ai_response_streaming(client, use_cache=use_cache, **request):
+            if isinstance(chunk, AIError):
+                yield chunk
+                return
+            yield from parser.feed(chunk)
+        return
+    
+    requests = _shard_requests(notes_content, num_questions, exam_type, avoid, use_cache)
+    for index, response in iter_ai_responses(requests, EXAM_SHARD_CONCURRENCY):
+        if isinstance(response, AIError):
+            yield response
+        else:
+            yield from JSONArrayStreamParser().feed(response)
+
+def generate_exam_from_notes_streaming(client, notes_content, num_questions=5, exam_type="multiple_choice", source_note_id=None):
+    """
+    Generate exam questions based on the notes content, yielding each one
+    as soon as it is available. Questions banked for the same note and
+    content are used first and only the remainder is generated. Exams larger than
+    EXAM_SHARD_QUESTIONS, or on notes longer than EXAM_NOTE_TOKENS, are
+    generated in concurrent shards, near-duplicate
+    questions are dropped, and shortfalls are topped up with further
+    requests. If fewer than num_questions could be generated because of a
+    failed request, the last item is an AIError.
+    """
+    deduper = QuestionDeduper()
+    generated = []
+    bank_hits = 0
+    finished = False
+    error = None
     try:
-        # Sometimes the AI wraps the JSON in markdown code blocks or adds text
-        # Let's try to extract just the JSON part
-        if "```json" in response:
-            json_text = response.split("```json")[1].split("```")[0].strip()
-        elif "```" in response:
-            json_text = response.split("```")[1].strip()
+        for question in question_bank.take_questions(source_note_id, notes_content, exam_type, num_questions):
+            if deduper.add(question):
+                bank_hits += 1
+                yield question
+        
+        for round_number in range(1 + EXAM_TOP_UP_ROUNDS):
+            missing = num_questions - len(deduper)
+            if missing <= 0:
+                break
+            avoid = [question["question"] for question in deduper.questions]
+            added = 0
+            # Top-up rounds skip the cache so they can't replay an earlier reply
+            for item in _generate_questions(client, notes_content, missing, exam_type, avoid, use_cache=round_number == 0):
+                if isinstance(item, AIError):
+                    error = item
+                elif len(deduper) < num_questions and deduper.add(item):
+                    generated.append(item)
+                    added += 1
+                    yield item
+            if not added:
+                # Another round is unlikely to do better
+                break
+        finished = True
+    finally:
+        # Bank what was generated even if the consumer stopped early
+        if generated:
+            question_bank.add_questions(source_note_id, notes_content, exam_type, generated)
+        # A consumer that stopped early only needed the questions it received
+        question_bank.record_lookup(num_questions if finished else len(deduper), bank_hits)
+    
+    if len(deduper) < num_questions and error is not None:
+        yield error
+
+def generate_exam_from_notes(client, notes_content, num_questions=5, exam_type="multiple_choice", source_note_id=None):
+    """Generate exam questions based on the notes content; returns an AIError if the request failed"""
+    questions = []
+    for item in generate_exam_from_notes_streaming(client, notes_content, num_questions, exam_type, source_note_id):
+        if isinstance(item, AIError):
+            if not questions:
+                return item
         else:
-            json_text = response
+            questions.append(item)
+    if not questions:
+        return [{"error": "Failed to parse AI response as JSON"}]
+    return questions
+
+def format_exam_option(exam):
+    """Label an exam in a selectbox; the date tells apart exams with the same title"""
+    created = datetime.fromtimestamp(exam["date_created"]).strftime("%b %d, %Y %I:%M %p")
+    return f"{exam['title']} ({exam['question_count']} questions, {created})"
+
+def show_question_results(results):
+    """Show the per-question results of an exam attempt"""
+    for i, result in enumerate(results):
+        st.write(f"**Question {i+1}:** {result['question']}")
+        st.write(f"Your answer: {result['user_answer']}")
+        st.write(f"Correct answer: {result['correct_answer']}")
+        
+        if result['is_correct']:
+            st.success("Correct!")
+        else:
+            st.error("Incorrect")
             
-        questions = json.loads(json_text)
-        return questions
-    except json.JSONDecodeError:
-        # If parsing fails, return the raw response
-        return [{"error": "Failed to parse AI response as JSON", "raw_response": response}]
+        st.write(f"Explanation: {result['explanation']}")
+        st.divider()
 
 def exam_interface():
     """Display the exam interface"""
     st.header("Exams")
     
-    # Initialize client
-    client = initialize_groq()
+    # Shared Groq client
+    client = get_groq_client()
+    user = st.session_state.get("username") or ""
     
     # Initialize session state for exams
-    if 'exams' not in st.session_state:
-        st.session_state.exams = []
     if 'current_exam' not in st.session_state:
         st.session_state.current_exam = None
-    if 'exam_results' not in st.session_state:
-        st.session_state.exam_results = []
     
     # Create simple exam interface
     st.subheader("Create or Take Exams")
 
-    exam_options = ["Create New Exam", "Take Practice Exam", "Review Previous Exams"]
+    exam_options = ["Create New Exam", "Take Practice Exam", "Review Previous Exams", "Exam Analytics"]
     selected_option = st.selectbox("Select an option:", exam_options)
     
     if selected_option == "Create New Exam":
         st.write("### Create New Exam")
         exam_title = st.text_input("Exam Title:")
         
-        # Source notes selection
-        if 'notes' in st.session_state and st.session_state.notes:
-            note_titles = [note["title"] for note in st.session_state.notes]
-            selected_note = st.selectbox("Select notes to base exam on:", note_titles)
-            
-            # Find the selected note
-            selected_note_content = next(
-                (note["content"] for note in st.session_state.notes 
-                 if note["title"] == selected_note), 
-                ""
+        # Source notes selection, by ID so notes with the same title can't be confused
+        notes = st.session_state.get("notes")
+        if notes:
+            selected_note_id = st.selectbox(
+                "Select notes to base exam on:",
+                [note["id"] for note in notes],
+                format_func=lambda note_id: notes.get(note_id)["title"]
             )
+            selected_note = notes.get(selected_note_id)["title"]
+            selected_note_content = notes.get(selected_note_id)["content"]
             
             # Exam generation options
             question_type = st.selectbox("Question Type:", ["Multiple Choice", "True/False", "Short Answer"])
@@ -109,22 +280,53 @@ def exam_interface():
             
             if st.button("Generate Exam"):
                 if selected_note_content:
-                    with st.spinner("Generating exam from notes..."):
-                        exam_type = question_type.lower().replace(" ", "_")
-                        questions = generate_exam_from_notes(client, selected_note_content, num_questions, exam_type)
-                        
+                    exam_type = question_type.lower().replace(" ", "_")
+                    progress = st.empty()
+                    preview = st.container()
+                    progress.caption("Generating exam from notes...")
+
+                    # Show each question as soon as it has been generated
+                    questions = []
+                    error = None
+                    start = time.perf_counter()
+                    bank_hits = question_bank.get_stats()["hits"]
+                    for item in generate_exam_from_notes_streaming(client, selected_note_content, num_questions, exam_type, selected_note_id):
+                        if isinstance(item, AIError):
+                            error = item
+                            break
+                        questions.append(item)
+                        if len(questions) == 1:
+                            first_question = time.perf_counter() - start
+                        with preview:
+                            st.write(f"**Question {len(questions)}:** {item.get('question', '')}")
+                        progress.caption(f"{len(questions)} of {num_questions} questions ready · first in {first_question:.1f}s")
+
+                    if questions and len(questions) < num_questions:
+                        st.warning(f"Only {len(questions)} of {num_questions} questions could be generated. {error or ''}")
+
+                    bank_stats = question_bank.get_stats()
+                    st.caption(
+                        f"{bank_stats['hits'] - bank_hits} of {len(questions)} questions from the question bank · "
+                        f"bank hit rate {bank_stats['hit_rate']:.0%} ({bank_stats['questions']} questions banked)"
+                    )
+
+                    # A failed request is reported without saving an empty exam
+                    if not questions:
+                        st.error(str(error) if error else "Failed to parse AI response as JSON")
+                    else:
                         # Create new exam
-                        new_exam = {
-                            "title": exam_title if exam_title else f"Exam on {selected_note}",
-                            "source_note": selected_note,
-                            "date_created": datetime.now().timestamp(),
-                            "questions": questions,
-                            "id": len(st.session_state.exams)
-                        }
-                        
-                        st.session_state.exams.append(new_exam)
+                        new_exam = exam_store.add_exam(
+                            user,
+                            exam_title if exam_title else f"Exam on {selected_note}",
+                            questions,
+                            source_note=selected_note,
+                            source_note_id=selected_note_id,
+                            exam_type=exam_type
+                        )
                         st.success(f"Exam '{new_exam['title']}' created successfully!")
                         st.session_state.current_exam = new_exam["id"]
+                        # The new exam is the newest, so it is on the picker's first page
+                        st.session_state.exam_list_page = 0
                 else:
                     st.error("Selected note has no content. Please add content to your notes first.")
         else:
@@ -133,16 +335,27 @@ def exam_interface():
     elif selected_option == "Take Practice Exam":
         st.write("### Available Exams")
         
-        if st.session_state.exams:
-            exam_titles = [exam["title"] for exam in st.session_state.exams]
-            selected_exam_title = st.selectbox("Select an exam to take:", exam_titles)
-            
-            # Find the selected exam
-            selected_exam = next(
-                (exam for exam in st.session_state.exams 
-                 if exam["title"] == selected_exam_title), 
-                None
+        title_filter = st.text_input("Filter exams by title:", key="exam_list_filter")
+        page = st.session_state.get("exam_list_page", 0)
+        exams, total = exam_store.list_exams(user, page, EXAM_LIST_PAGE_SIZE, title_filter)
+        if not exams and page > 0:
+            # A narrower filter can leave the current page past the end
+            page = st.session_state.exam_list_page = 0
+            exams, total = exam_store.list_exams(user, page, EXAM_LIST_PAGE_SIZE, title_filter)
+        if exams:
+            exams_by_id = {exam["id"]: exam for exam in exams}
+            exam_ids = list(exams_by_id)
+            # Preselect the exam that was just created
+            current = st.session_state.current_exam
+            selected_exam_id = st.selectbox(
+                "Select an exam to take:",
+                exam_ids,
+                index=exam_ids.index(current) if current in exams_by_id else 0,
+                format_func=lambda exam_id: format_exam_option(exams_by_id[exam_id])
             )
+            paginate("exam_list_page", page, total, EXAM_LIST_PAGE_SIZE, "exams")
+            
+            selected_exam = exam_store.get_exam(selected_exam_id)
             
             if selected_exam:
                 st.write(f"### {selected_exam['title']}")
@@ -160,7 +373,7 @@ def exam_interface():
                         answer = st.radio(
                             f"Select your answer for question {i+1}:",
                             options,
-                            key=f"q_{i}"
+                            key=f"q_{selected_exam_id}_{i}"
                         )
                         user_answers.append(answer)
                     elif q.get("question", "").strip().endswith("?"):
@@ -168,27 +381,23 @@ def exam_interface():
                         answer = st.radio(
                             f"Select your answer for question {i+1}:",
                             ["True", "False"],
-                            key=f"q_{i}"
+                            key=f"q_{selected_exam_id}_{i}"
                         )
                         user_answers.append(answer)
                     else:
                         # Short answer
                         answer = st.text_area(
                             f"Your answer for question {i+1}:",
-                            key=f"q_{i}"
+                            key=f"q_{selected_exam_id}_{i}"
                         )
                         user_answers.append(answer)
                 
                 if st.button("Submit Exam"):
-                    score = 0
                     results = []
                     
                     for i, (q, user_answer) in enumerate(zip(selected_exam["questions"], user_answers)):
                         correct_answer = q.get("answer", "")
-                        is_correct = (user_answer.lower() == correct_answer.lower())
-                        
-                        if is_correct:
-                            score += 1
+                        is_correct = (str(user_answer).lower() == correct_answer.lower())
                             
                         results.append({
                             "question": q.get("question", ""),
@@ -199,65 +408,101 @@ def exam_interface():
                         })
                     
                     # Save results
-                    exam_result = {
-                        "exam_id": selected_exam["id"],
-                        "exam_title": selected_exam["title"],
-                        "date_taken": datetime.now().timestamp(),
-                        "score": score,
-                        "total_questions": len(selected_exam["questions"]),
-                        "percentage": (score / len(selected_exam["questions"])) * 100 if selected_exam["questions"] else 0,
-                        "results": results
-                    }
-                    
-                    st.session_state.exam_results.append(exam_result)
-                    st.success(f"Exam submitted! Your score: {score}/{len(selected_exam['questions'])} ({exam_result['percentage']:.1f}%)")
+                    exam_result = exam_store.add_attempt(user, selected_exam, results)
+                    st.success(f"Exam submitted! Your score: {exam_result['score']}/{exam_result['total_questions']} ({exam_result['percentage']:.1f}%)")
                     
                     # Show results
                     st.write("### Results")
-                    for i, result in enumerate(results):
-                        st.write(f"**Question {i+1}:** {result['question']}")
-                        st.write(f"Your answer: {result['user_answer']}")
-                        st.write(f"Correct answer: {result['correct_answer']}")
-                        
-                        if result['is_correct']:
-                            st.success("Correct!")
-                        else:
-                            st.error("Incorrect")
-                            
-                        st.write(f"Explanation: {result['explanation']}")
-                        st.divider()
+                    show_question_results(results)
+        elif title_filter:
+            st.info("No exams match this filter.")
         else:
             st.info("No exams available yet. Create one first!")
         
-    else:  # Review Previous Exams
+    elif selected_option == "Review Previous Exams":
         st.write("### Exam History")
         
-        if st.session_state.exam_results:
-            for result in st.session_state.exam_results:
+        page = st.session_state.get("exam_history_page", 0)
+        attempts, total = exam_store.list_attempts(user, page, EXAM_HISTORY_PAGE_SIZE)
+        if attempts:
+            for result in attempts:
                 col1, col2, col3 = st.columns([3, 1, 1])
                 with col1:
                     st.write(f"**{result['exam_title']}**")
+                    st.caption(datetime.fromtimestamp(result['date_taken']).strftime("%b %d, %Y %I:%M %p"))
                 with col2:
                     st.write(f"Score: {result['score']}/{result['total_questions']}")
                 with col3:
                     st.write(f"{result['percentage']:.1f}%")
                 
-                if st.button(f"View Results", key=f"view_{result['exam_title']}_{result['date_taken']}"):
+                if st.button(f"View Results", key=f"view_attempt_{result['id']}"):
                     st.write("### Detailed Results")
-                    for i, question_result in enumerate(result['results']):
-                        st.write(f"**Question {i+1}:** {question_result['question']}")
-                        st.write(f"Your answer: {question_result['user_answer']}")
-                        st.write(f"Correct answer: {question_result['correct_answer']}")
-                        
-                        if question_result['is_correct']:
-                            st.success("Correct!")
-                        else:
-                            st.error("Incorrect")
-                            
-                        st.write(f"Explanation: {question_result['explanation']}")
-                        st.divider()
+                    show_question_results(exam_store.get_answers(result['id']))
+            
+            # Pagination controls
+            paginate("exam_history_page", page, total, EXAM_HISTORY_PAGE_SIZE, "attempts")
         else:
             st.info("No exam history available.")
+    
+    else:  # Exam Analytics
+        display_exam_analytics(user)
+
+def get_exam_analytics(user):
+    """Return the user's exam analytics, recomputed only after a new attempt is submitted"""
+    version = (user, exam_store.attempts_version(user))
+    cached = st.session_state.get("exam_analytics")
+    if cached is None or cached[0] != version:
+        cached = (version, build_exam_analytics(*exam_store.load_history_frames(user)))
+        st.session_state.exam_analytics = cached
+    return cached[1]
+
+def display_exam_analytics(user):
+    """Show accuracy per note and per question, score trends and the weakest topics"""
+    st.write("### Exam Analytics")
+    
+    analytics = get_exam_analytics(user)
+    summary = analytics["summary"]
+    if not summary["attempts"]:
+        st.info("No exam history available.")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Attempts", f"{summary['attempts']:,}")
+    col2.metric("Questions answered", f"{summary['answers']:,}")
+    col3.metric("Accuracy", f"{summary['accuracy']:.1%}")
+    col4.metric("Average score", f"{summary['average_score']:.1f}%")
+    
+    accuracy_column = st.column_config.ProgressColumn("Accuracy", min_value=0, max_value=1, format="percent")
+    
+    st.write("#### Score trend")
+    periods = {"Day": "D", "Week": "W", "Month": "MS"}
+    period = st.radio("Average per:", list(periods), index=1, horizontal=True, key="exam_trend_period")
+    st.line_chart(score_trend(analytics["daily"], periods[period])["average_score"])
+    
+    st.write("#### Accuracy by note")
+    st.dataframe(
+        analytics["by_note"][["source_note", "attempts", "answers", "accuracy"]],
+        column_config={"source_note": "Note", "accuracy": accuracy_column},
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    st.write("#### Weakest topics")
+    min_answers = st.slider("Minimum answers per topic:", 1, 50, 10, key="exam_topic_min_answers")
+    st.dataframe(
+        weakest_topics(analytics["by_question"], min_answers),
+        column_config={"topic": "Topic", "accuracy": accuracy_column},
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    st.write("#### Hardest questions")
+    st.dataframe(
+        weakest_questions(analytics["by_question"], min_answers=min(min_answers, 3)),
+        column_config={"question": "Question", "source_note": "Note", "accuracy": accuracy_column},
+        hide_index=True,
+        use_container_width=True
+    )
 
 def display_exams():
     """Function to display exams tab"""
@@ -269,13 +514,13 @@ def main():
         return
 
     st.set_page_config(layout="wide", page_title="Interactive Learning Platform")
-    client = initialize_groq()
+    client = get_groq_client()
     
     # Initialize session state
     if 'messages' not in st.session_state:
         st.session_state.messages = []
     if 'notes' not in st.session_state:
-        st.session_state.notes = []
+        st.session_state.notes = NoteIndex()
     if 'current_note' not in st.session_state:
         st.session_state.current_note = None
     if 'show_analysis' not in st.session_state:
@@ -0,0 +1,246 @@
+import json
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+class SQLiteExamStore:
+    def __init__(self, db_path='exams.db'):
+        """
+        Initialize a SQLite-backed store for exams and exam attempts. Exams
+        and attempts are looked up by ID, and each user's exams and attempt
+        history are read through (user, date) indexes a page at a time.
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self._create_tables()
+
+    def _create_tables(self):
+        """
+        Create the exams, questions, attempts and answers tables if they don't exist
+        """
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS exams (
+                    id INTEGER PRIMARY KEY,
+                    user TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    source_note TEXT,
+                    source_note_id INTEGER,
+                    exam_type TEXT,
+                    date_created REAL NOT NULL
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_exams_user_date ON exams (user, date_created)')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS questions (
+                    exam_id INTEGER NOT NULL REFERENCES exams (id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    question TEXT NOT NULL,
+                    options TEXT,
+                    answer TEXT,
+                    explanation TEXT,
+                    PRIMARY KEY (exam_id, position)
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS attempts (
+                    id INTEGER PRIMARY KEY,
+                    user TEXT NOT NULL,
+                    exam_id INTEGER NOT NULL REFERENCES exams (id) ON DELETE CASCADE,
+                    exam_title TEXT NOT NULL,
+                    date_taken REAL NOT NULL,
+                    score INTEGER NOT NULL,
+                    total_questions INTEGER NOT NULL,
+                    percentage REAL NOT NULL
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_attempts_user_date ON attempts (user, date_taken)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_attempts_exam_date ON attempts (exam_id, date_taken)')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS answers (
+                    attempt_id INTEGER NOT NULL REFERENCES attempts (id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    question TEXT NOT NULL,
+                    user_answer TEXT,
+                    correct_answer TEXT,
+                    is_correct INTEGER NOT NULL,
+                    explanation TEXT,
+                    PRIMARY KEY (attempt_id, position)
+                )
+            ''')
+
+    def add_exam(self, user, title, questions, source_note=None, source_note_id=None, exam_type=None):
+        """Save an exam and its questions in one transaction; returns the exam with its new ID"""
+        date_created = time.time()
+        with self.lock, self.conn:
+            cursor = self.conn.execute('''
+                INSERT INTO exams (user, title, source_note, source_note_id, exam_type, date_created)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user, title, source_note, source_note_id, exam_type, date_created))
+            exam_id = cursor.lastrowid
+            self.conn.executemany('''
+                INSERT INTO questions (exam_id, position, question, options, answer, explanation)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [
+                (exam_id, position, q.get("question", ""),
+                 json.dumps(q["options"]) if isinstance(q.get("options"), list) else None,
+                 str(q.get("answer", "")), q.get("explanation", ""))
+                for position, q in enumerate(questions)
+            ])
+        return {
+            "id": exam_id,
+            "title": title,
+            "source_note": source_note,
+            "source_note_id": source_note_id,
+            "exam_type": exam_type,
+            "date_created": date_created,
+            "questions": questions
+        }
+
+    def list_exams(self, user, page=0, page_size=20, query=None):
+        """
+        Return (exams, total) for one page of a user's exams, newest first,
+        without their questions, optionally only those whose title contains query
+        """
+        where = 'e.user = ?'
+        params = [user]
+        if query:
+            where += " AND e.title LIKE ? ESCAPE '\\'"
+            escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{escaped}%")
+        with self.lock:
+            total = self.conn.execute(f'SELECT COUNT(*) FROM exams e WHERE {where}', params).fetchone()[0]
+            rows = self.conn.execute(f'''
+                SELECT e.id, e.title, e.source_note, e.source_note_id, e.exam_type, e.date_created,
+                       (SELECT COUNT(*) FROM questions q WHERE q.exam_id = e.id) AS question_count
+                FROM exams e WHERE {where}
+                ORDER BY e.date_created DESC
+                LIMIT ? OFFSET ?
+            ''', params + [page_size, page * page_size]).fetchall()
+        return [dict(row) for row in rows], total
+
+    def get_exam(self, exam_id):
+        """Retrieve an exam with its questions by ID, or None if it doesn't exist"""
+        with self.lock:
+            row = self.conn.execute('SELECT * FROM exams WHERE id = ?', (exam_id,)).fetchone()
+            if row is None:
+                return None
+            question_rows = self.conn.execute(
+                'SELECT * FROM questions WHERE exam_id = ? ORDER BY position', (exam_id,)
+            ).fetchall()
+        exam = dict(row)
+        exam["questions"] = []
+        for q in question_rows:
+            question = {"question": q["question"], "answer": q["answer"], "explanation": q["explanation"]}
+            if q["options"] is not None:
+                question["options"] = json.loads(q["options"])
+            exam["questions"].append(question)
+        return exam
+
+    def add_attempt(self, user, exam, results):
+        """
+        Save an attempt at an exam with its per-question results (dicts with
+        question, user_answer, correct_answer, is_correct and explanation).
+        Returns the attempt with its new ID.
+        """
+        score = sum(1 for result in results if result["is_correct"])
+        total = len(exam["questions"])
+        attempt = {
+            "exam_id": exam["id"],
+            "exam_title": exam["title"],
+            "date_taken": time.time(),
+            "score": score,
+            "total_questions": total,
+            "percentage": (score / total) * 100 if total else 0,
+            "results": results
+        }
+        with self.lock, self.conn:
+            cursor = self.conn.execute('''
+                INSERT INTO attempts (user, exam_id, exam_title, date_taken, score, total_questions, percentage)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (user, attempt["exam_id"], attempt["exam_title"], attempt["date_taken"],
+                  score, total, attempt["percentage"]))
+            attempt["id"] = cursor.lastrowid
+            self.conn.executemany('''
+                INSERT INTO answers (attempt_id, position, question, user_answer, correct_answer, is_correct, explanation)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (attempt["id"], position, result["question"], result["user_answer"],
+                 result["correct_answer"], int(result["is_correct"]), result["explanation"])
+                for position, result in enumerate(results)
+            ])
+        return attempt
+
+    def list_attempts(self, user, page=0, page_size=20):
+        """Return (attempts, total) for one page of a user's attempts, newest first, without their answers"""
+        with self.lock:
+            total = self.conn.execute('SELECT COUNT(*) FROM attempts WHERE user = ?', (user,)).fetchone()[0]
+            rows = self.conn.execute('''
+                SELECT * FROM attempts WHERE user = ?
+                ORDER BY date_taken DESC
+                LIMIT ? OFFSET ?
+            ''', (user, page_size, page * page_size)).fetchall()
+        return [dict(row) for row in rows], total
+
+    def get_answers(self, attempt_id):
+        """Retrieve the per-question results of an attempt"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT * FROM answers WHERE attempt_id = ? ORDER BY position', (attempt_id,)
+            ).fetchall()
+        return [
+            {
+                "question": row["question"],
+                "user_answer": row["user_answer"],
+                "correct_answer": row["correct_answer"],
+                "is_correct": bool(row["is_correct"]),
+                "explanation": row["explanation"]
+            }
+            for row in rows
+        ]
+
+    def attempts_version(self, user):
+        """Return a value that changes whenever the user submits an attempt"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT COUNT(*), MAX(id) FROM attempts WHERE user = ?', (user,)
+            ).fetchone()
+        return tuple(row)
+
+    def load_history_frames(self, user):
+        """
+        Load a user's whole exam history as (attempts, answers, questions)
+        DataFrames for analytics. Answers carry only IDs and correctness;
+        question text and source note are loaded once per exam question.
+        Notes are identified by source_note_id (-1 if unknown); the title
+        is only a label.
+        """
+        with self.lock:
+            attempts = pd.read_sql_query('''
+                SELECT a.id, a.exam_id, COALESCE(e.source_note_id, -1) AS source_note_id,
+                       COALESCE(e.source_note, '(unknown)') AS source_note, a.date_taken, a.score, a.total_questions, a.percentage
+                FROM attempts a JOIN exams e ON e.id = a.exam_id
+                WHERE a.user = ?
+            ''', self.conn, params=(user,))
+            answers = pd.read_sql_query('''
+                SELECT a.exam_id, ans.position, ans.is_correct
+                FROM attempts a JOIN answers ans ON ans.attempt_id = a.id
+                WHERE a.user = ?
+            ''', self.conn, params=(user,))
+            questions = pd.read_sql_query('''
+                SELECT q.exam_id, q.position, q.question, COALESCE(e.source_note_id, -1) AS source_note_id,
+                       COALESCE(e.source_note, '(unknown)') AS source_note
+                FROM exams e JOIN questions q ON q.exam_id = e.id
+                WHERE e.user = ?
+            ''', self.conn, params=(user,))
+        return attempts, answers, questions
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
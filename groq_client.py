@@ -1,139 +1,428 @@
+import asyncio
 import os
-from groq import Groq
+import queue
+from response_cache import ResponseCache, make_cache_key
+from single_flight import SingleFlight
+from note_chunks import split_notes
+from token_budget import count_tokens, estimate_tokens, fit_prompt
+from stream_metrics import StreamMetrics
+from math_format import MathStreamFormatter, is_math_related, rewrite_math_symbols
+from client_pool import get_async_groq_client, get_groq_client, get_pool_stats, run_in_background
+from request_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, AIError, RequestScheduler, classify_error
 
-def initialize_groq():
-    """Initialize and return a Groq client"""
-    return Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Process-wide cache of AI responses, shared by every session
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("GROQ_CACHE_MAX_ENTRIES", "256")),
+    ttl=float(os.getenv("GROQ_CACHE_TTL", "3600")),
+    disk_path=os.getenv("GROQ_CACHE_PATH") or None
+)
 
-def get_ai_response(client, prompt, system_message="You are a helpful AI assistant. Provide clear and accurate responses to questions."):
-    """Get a synchronous response from the Groq API"""
+# Long notes are condensed in parts of this many characters, this many at a time
+NOTES_CHUNK_CHARS = int(os.getenv("NOTES_CHUNK_CHARS", "6000"))
+NOTES_MAP_CONCURRENCY = int(os.getenv("NOTES_MAP_CONCURRENCY", "4"))
+
+# Time to first token and generation speed of streamed responses
+stream_metrics = StreamMetrics()
+
+# Every upstream request goes through one scheduler, so the whole process respects the rate limits
+scheduler = RequestScheduler(
+    requests_per_minute=int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30")),
+    tokens_per_minute=int(os.getenv("GROQ_TOKENS_PER_MINUTE", "60000")),
+    max_retries=int(os.getenv("GROQ_MAX_RETRIES", "3"))
+)
+
+# Identical requests in flight at the same time, from any session, share one upstream call
+single_flight = SingleFlight()
+
+def get_cache_stats():
+    """Return hit/miss counters for the AI response cache"""
+    return response_cache.get_stats()
+
+def get_stream_stats():
+    """Return time-to-first-token and tokens-per-second percentiles for streamed responses"""
+    return stream_metrics.get_stats()
+
+def get_scheduler_stats():
+    """Return request admission, retry and circuit breaker state"""
+    return scheduler.get_stats()
+
+def get_single_flight_stats():
+    """Return how many AI calls were made and how many were deduplicated"""
+    return single_flight.get_stats()
+
+def _prepare_request(prompt, system_message, default_temperature="0.7", stream=False, max_tokens=None, format_math=True):
+    """
+    Build the chat completion parameters and cache key for a prompt.
+    format_math=False skips the LaTeX handling, for replies parsed as data.
+    """
+    # Check if the prompt is likely about mathematical content
+    math_related = format_math and is_math_related(prompt)
+
+    if math_related:
+        # Add special instruction for mathematical content display
+        system_message += " If the user asks about mathematical concepts, display equations and symbols using LaTeX for proper formatting."
+    
+    model = os.getenv("GROQ_MODEL", "llama3-70b-8192")  # Updated default model
+    temperature = float(os.getenv("AI_TEMPERATURE", default_temperature))
+    
+    # Fit the prompt to the model's context before sending, and give the reply what's left
+    prompt, max_tokens = fit_prompt(
+        prompt, system_message, model, max_tokens=max_tokens or int(os.getenv("AI_MAX_TOKENS", "1024"))
+    )
+    
+    cache_params = dict(
+        model=model, system_message=system_message, prompt=prompt,
+        temperature=temperature, max_tokens=max_tokens
+    )
+    if stream:
+        cache_params["stream"] = True
+    
+    return {
+        "is_math_related": math_related,
+        "cache_key": make_cache_key(**cache_params),
+        "messages": [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ],
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        # Reserved against the tokens-per-minute budget; unused tokens are refunded
+        "tokens": count_tokens(system_message) + count_tokens(prompt) + max_tokens
+    }
+
+def _format_math_response(response):
+    """Rewrite common math symbols as LaTeX so streamlit's markdown renders them"""
+    response = rewrite_math_symbols(response)
+    
+    # Add instructions for properly displaying the response
+    return "This response contains mathematical notation. Viewing it with LaTeX rendering enabled:\n\n" + response
+
+def _refund_unused(request, chat_completion):
+    """Give back the part of the token reservation the completion didn't use"""
+    usage = getattr(chat_completion, "usage", None)
+    if usage is not None and usage.total_tokens:
+        scheduler.refund(request["tokens"] - usage.total_tokens)
+
+def _refund_unused_stream(request, usage, generated):
+    """
+    Give back the unused part of a streamed request's reservation, using the
+    usage reported at the end of the stream or, if the stream ended without
+    it, a local estimate of the prompt and the text generated so far
+    """
+    if usage is not None and usage.total_tokens:
+        used = usage.total_tokens
+    else:
+        used = request["tokens"] - request["max_tokens"] + estimate_tokens("".join(generated))
+    scheduler.refund(request["tokens"] - used)
+
+def _finish_response(request, chat_completion, use_cache):
+    """Format and cache a completed chat completion"""
+    _refund_unused(request, chat_completion)
+    response = chat_completion.choices[0].message.content
+    
+    # Enable LaTeX rendering for math-related responses
+    if request["is_math_related"]:
+        response = _format_math_response(response)
+    
+    if use_cache:
+        response_cache.put(request["cache_key"], response)
+    return response
+
+def _complete(client, request, use_cache, priority):
+    """Make one scheduled upstream chat completion; returns the response or an AIError"""
+    chat_completion = scheduler.call(
+        lambda: client.chat.completions.create(
+            messages=request["messages"],
+            model=request["model"],
+            temperature=request["temperature"],
+            max_tokens=request["max_tokens"]
+        ),
+        request["tokens"], priority
+    )
+    if isinstance(chat_completion, AIError):
+        return chat_completion
+    return _finish_response(request, chat_completion, use_cache)
+
+async def _complete_async(client, request, use_cache, priority):
+    """Async version of _complete (client is an AsyncGroq)"""
+    chat_completion = await scheduler.call_async(
+        lambda: client.chat.completions.create(
+            messages=request["messages"],
+            model=request["model"],
+            temperature=request["temperature"],
+            max_tokens=request["max_tokens"]
+        ),
+        request["tokens"], priority
+    )
+    if isinstance(chat_completion, AIError):
+        return chat_completion
+    return _finish_response(request, chat_completion, use_cache)
+
+def get_ai_response(client, prompt, system_message="You are a helpful AI assistant. Provide clear and accurate responses to questions.", use_cache=True, priority=PRIORITY_INTERACTIVE, max_tokens=None, format_math=True):
+    """
+    Get a synchronous response from the Groq API, served from the cache when
+    possible. Returns the response text, or an AIError if the request failed.
+    max_tokens overrides AI_MAX_TOKENS for requests that need longer replies;
+    format_math=False leaves the reply untouched (e.g. JSON to be parsed).
+    """
     try:
-        # Check if the prompt is likely about mathematical content
-        math_keywords = ["math", "equation", "formula", "symbol", "pi", "π", "sigma", "integral", 
-                         "derivative", "calculus", "algebra", "theta", "alpha", "beta", "gamma"]
+        request = _prepare_request(prompt, system_message, max_tokens=max_tokens, format_math=format_math)
+        if use_cache:
+            cached = response_cache.get(request["cache_key"])
+            if cached is not None:
+                return cached
         
-        is_math_related = any(keyword in prompt.lower() for keyword in math_keywords)
+        return single_flight.do(
+            request["cache_key"],
+            lambda: _complete(client, request, use_cache, priority)
+        )
+    except Exception as e:
+        return classify_error(e)
 
-        if is_math_related:
-            # Add special instruction for mathematical content display
-            system_message += " If the user asks about mathematical concepts, display equations and symbols using LaTeX for proper formatting."
+async def get_ai_response_async(client, prompt, system_message="You are a helpful AI assistant. Provide clear and accurate responses to questions.", use_cache=True, priority=PRIORITY_INTERACTIVE, max_tokens=None, format_math=True):
+    """Get a response from the Groq API without blocking the event loop (client is an AsyncGroq)"""
+    try:
+        request = _prepare_request(prompt, system_message, max_tokens=max_tokens, format_math=format_math)
+        if use_cache:
+            cached = response_cache.get(request["cache_key"])
+            if cached is not None:
+                return cached
         
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            model=os.getenv("GROQ_MODEL", "llama3-70b-8192"),  # Updated default model
-            temperature=float(os.getenv("AI_TEMPERATURE", "0.7")),
-            max_tokens=1024
+        return await single_flight.do_async(
+            request["cache_key"],
+            lambda: _complete_async(client, request, use_cache, priority)
         )
-        
-        response = chat_completion.choices[0].message.content
-        
-        # Enable LaTeX rendering for math-related responses
-        if is_math_related:
-            # Process response to enable LaTeX rendering using streamlit's markdown
-            common_symbols = {
-                "pi": "$\\pi$",
-                "π": "$\\pi$",
-                "theta": "$\\theta$",
-                "θ": "$\\theta$",
-                "sigma": "$\\sigma$",
-                "Σ": "$\\Sigma$",
-                "delta": "$\\delta$",
-                "Δ": "$\\Delta$",
-                "alpha": "$\\alpha$",
-                "β": "$\\beta$",
-                "gamma": "$\\gamma$",
-                "lambda": "$\\lambda$",
-                "μ": "$\\mu$",
-                "square root": "$\\sqrt{x}$",
-                "infinity": "$\\infty$"
-            }
-            
-            # Replace common symbols with LaTeX versions
-            for symbol, latex in common_symbols.items():
-                # Use word boundaries to avoid replacing parts of words
-                response = response.replace(f" {symbol} ", f" {latex} ")
-                response = response.replace(f" {symbol},", f" {latex},")
-                response = response.replace(f" {symbol}.", f" {latex}.")
-                
-            # Add instructions for properly displaying the response
-            response = "This response contains mathematical notation. Viewing it with LaTeX rendering enabled:\n\n" + response
-            
-        return response
     except Exception as e:
-        return f"Error getting AI response: {str(e)}"
+        return classify_error(e)
 
-def get_ai_response_streaming(client, prompt, system_message="You are a helpful AI assistant. Provide clear and accurate responses to questions."):
-    """Get a streaming response from the Groq API"""
-    try:
-        # Check if the prompt is likely about mathematical content
-        math_keywords = ["math", "equation", "formula", "symbol", "pi", "π", "sigma", "integral", 
-                         "derivative", "calculus", "algebra", "theta", "alpha", "beta", "gamma"]
+async def _indexed(index, awaitable):
+    """Await a coroutine and tag its result with its position"""
+    return index, await awaitable
+
+async def get_ai_responses_as_completed(client, requests, concurrency=None):
+    """
+    Run independent requests concurrently and yield (index, response) pairs
+    in completion order. Each request is a dict of get_ai_response_async
+    keyword arguments (prompt, system_message, use_cache, priority). At most
+    `concurrency` requests are in flight at once when it is given.
+    """
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+    
+    async def limited(request):
+        if semaphore is None:
+            return await get_ai_response_async(client, **request)
+        async with semaphore:
+            return await get_ai_response_async(client, **request)
+    
+    tasks = [
+        asyncio.ensure_future(_indexed(index, limited(request)))
+        for index, request in enumerate(requests)
+    ]
+    for next_done in asyncio.as_completed(tasks):
+        yield await next_done
+
+def iter_ai_responses(requests, concurrency=None):
+    """
+    Run independent requests concurrently from synchronous code and yield
+    (index, response) pairs as each one finishes. The requests run on the
+    shared background event loop and its pooled client, so results are
+    consumed (and can be rendered) on the caller's thread.
+    """
+    results = queue.Queue()
+    finished = object()
+    
+    async def run():
+        client = get_async_groq_client()
+        async for item in get_ai_responses_as_completed(client, requests, concurrency):
+            results.put(item)
+    
+    def done(future):
+        if future.exception() is not None:
+            # Requests that never completed report the failure like any other error
+            error = classify_error(future.exception())
+            for index in range(len(requests)):
+                results.put((index, error))
+        results.put(finished)
+    
+    run_in_background(run()).add_done_callback(done)
+    reported = set()
+    while True:
+        item = results.get()
+        if item is finished:
+            return
+        if item[0] not in reported:
+            reported.add(item[0])
+            yield item
+
+def fan_out_ai_responses(requests, on_result, concurrency=None):
+    """
+    Run independent requests concurrently from synchronous code, calling
+    on_result(index, response) as soon as each one finishes. Returns the
+    responses in request order.
+    """
+    responses = [None] * len(requests)
+    for index, response in iter_ai_responses(requests, concurrency):
+        responses[index] = response
+        on_result(index, response)
+    return responses
+
+def _condense_parts(notes, system_message, on_partial=None):
+    """
+    Map step for long notes: split them into parts and condense every part
+    concurrently, keeping what the final task needs. Returns (prompt, error)
+    where prompt is the text to send to the final (reduce) request and
+    error is an AIError if any part failed.
+    """
+    parts = split_notes(notes, NOTES_CHUNK_CHARS)
+    while len(parts) > 1:
+        map_message = f"""You are a study assistant condensing one part of a longer set of notes.
+        Rewrite this part as concise notes that keep every key concept, definition, formula,
+        example and open question, so that the following task can be completed from your
+        condensed notes alone. Do not perform the task itself.
         
-        is_math_related = any(keyword in prompt.lower() for keyword in math_keywords)
+        Task: {system_message}"""
+        # Condensing is bulk work, so interactive requests go ahead of it. Parts
+        # are intermediate text, so math formatting is left to the final request
+        requests = [
+            {"prompt": part, "system_message": map_message, "priority": PRIORITY_BULK, "format_math": False}
+            for part in parts
+        ]
         
-        if is_math_related:
-            # Add special instruction for mathematical content display
-            system_message += " If the user asks about mathematical concepts, display equations and symbols using LaTeX for proper formatting."
+        condensed = [None] * len(parts)
+        for index, response in iter_ai_responses(requests, NOTES_MAP_CONCURRENCY):
+            condensed[index] = response
+            if on_partial is not None:
+                on_partial(index, len(parts), response)
         
-        # Create the streaming chat completion
-        completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            model=os.getenv("GROQ_MODEL", "llama3-70b-8192"),  
-            temperature=float(os.getenv("AI_TEMPERATURE", "1")),
-            stream=True,
-           max_completion_tokens=1024
+        for response in condensed:
+            if isinstance(response, AIError):
+                return None, response
+        
+        notes = "\n\n".join(
+            f"## Part {index + 1} of {len(condensed)}\n\n{response}"
+            for index, response in enumerate(condensed)
         )
+        next_parts = split_notes(notes, NOTES_CHUNK_CHARS)
+        if len(next_parts) >= len(parts):
+            # Condensing didn't shrink the notes, so reduce what we have
+            break
+        parts = next_parts
+        # Later rounds condense the condensed notes
+        on_partial = None
+    return notes, None
+
+def map_reduce_ai_response(client, notes, system_message, on_partial=None):
+    """
+    Get a response for notes of any length. Notes that fit in one request
+    are sent as-is; longer notes are split on headings and paragraphs,
+    condensed concurrently, and the condensed parts are combined in one
+    final request. on_partial(index, count, text) is called as each part
+    finishes.
+    """
+    prompt, error = _condense_parts(notes, system_message, on_partial)
+    if error is not None:
+        return error
+    return get_ai_response(client, prompt, system_message)
+
+def map_reduce_ai_response_streaming(client, notes, system_message, on_partial=None):
+    """Streaming version of map_reduce_ai_response; only the final request is streamed"""
+    prompt, error = _condense_parts(notes, system_message, on_partial)
+    if error is not None:
+        yield error
+        return
+    yield from get_ai_response_streaming(client, prompt, system_message)
+
+def _stream_completion(client, request, use_cache, priority):
+    """
+    Make one scheduled upstream streaming completion, yielding chunks and
+    caching what was yielded. A failure ends the stream with an AIError.
+    """
+    try:
+        # Create the streaming chat completion; failures before the first chunk are retried
+        completion = scheduler.call(
+            lambda: client.chat.completions.create(
+                messages=request["messages"],
+                model=request["model"],
+                temperature=request["temperature"],
+                stream=True,
+                max_completion_tokens=request["max_tokens"]
+            ),
+            request["tokens"], priority
+        )
+        if isinstance(completion, AIError):
+            yield completion
+            return
         
-        # Collect response for potential math symbol processing
-        full_response = ""
+        # Everything yielded to the caller, so a cache hit replays exactly what was shown
+        streamed = []
+        # Raw model output and reported usage, for refunding the unused reservation
+        generated = []
+        usage = None
+        # Math-related responses are rewritten as they stream
+        formatter = MathStreamFormatter() if request["is_math_related"] else None
         
-        # Stream the response
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
-                content = chunk.choices[0].delta.content
-                full_response += content
-                yield content
+        try:
+            # Stream the response
+            for chunk in completion:
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None and x_groq.usage is not None:
+                    usage = x_groq.usage
+                elif getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    content = chunk.choices[0].delta.content
+                    generated.append(content)
+                    if formatter is not None:
+                        content = formatter.feed(content)
+                    if content:
+                        streamed.append(content)
+                        yield content
+        finally:
+            # Also runs when the stream fails midway or the consumer stops reading
+            _refund_unused_stream(request, usage, generated)
         
-        # If math-related, do post-processing for LaTeX symbols
-        if is_math_related:
-            common_symbols = {
-                "pi": "$\\pi$",
-                "π": "$\\pi$",
-                "theta": "$\\theta$",
-                "θ": "$\\theta$",
-                "sigma": "$\\sigma$",
-                "Σ": "$\\Sigma$",
-                "delta": "$\\delta$",
-                "Δ": "$\\Delta$",
-                "alpha": "$\\alpha$",
-                "β": "$\\beta$",
-                "gamma": "$\\gamma$",
-                "lambda": "$\\lambda$",
-                "μ": "$\\mu$",
-                "square root": "$\\sqrt{x}$",
-                "infinity": "$\\infty$"
-            }
-            
-            # Replace common symbols with LaTeX versions
-            for symbol, latex in common_symbols.items():
-                full_response = full_response.replace(f" {symbol} ", f" {latex} ")
-                full_response = full_response.replace(f" {symbol},", f" {latex},")
-                full_response = full_response.replace(f" {symbol}.", f" {latex}.")
+        if formatter is not None:
+            rest = formatter.finish()
+            if rest:
+                streamed.append(rest)
+                yield rest
             
             # Yield a final LaTeX instruction
-            yield "\n\n*Note: This response contains mathematical notation. Best viewed with LaTeX rendering enabled.*"
+            latex_note = "\n\n*Note: This response contains mathematical notation. Best viewed with LaTeX rendering enabled.*"
+            streamed.append(latex_note)
+            yield latex_note
+        
+        if use_cache:
+            response_cache.put(request["cache_key"], "".join(streamed))
     
     except Exception as e:
-        yield f"Error getting AI response: {str(e)}"
+        yield classify_error(e)
+
+def get_ai_response_streaming(client, prompt, system_message="You are a helpful AI assistant. Provide clear and accurate responses to questions.", use_cache=True, priority=PRIORITY_INTERACTIVE, max_tokens=None, format_math=True):
+    """
+    Get a streaming response from the Groq API; cached responses are replayed
+    in one chunk, and identical in-flight streams share one upstream call.
+    Yields text chunks; if the request fails the last item is an AIError.
+    max_tokens and format_math are as for get_ai_response.
+    """
+    try:
+        request = _prepare_request(prompt, system_message, stream=True, max_tokens=max_tokens, format_math=format_math)
+        if use_cache:
+            cached = response_cache.get(request["cache_key"])
+            if cached is not None:
+                yield cached
+                return
+        
+        yield from single_flight.stream(
+            request["cache_key"],
+            lambda: _stream_completion(client, request, use_cache, priority)
+        )
+    except Exception as e:
+        yield classify_error(e)
 
 
-def analyze_notes(client, notes):
+def analyze_notes(client, notes, on_partial=None):
     """Analyze notes using the Groq API"""
     system_message = """You are an educational analyst. Analyze the following notes and provide:
     1. Main concepts covered
@@ -142,9 +431,9 @@ def analyze_notes(client, notes):
     4. Key points to review
     Be specific and constructive in your feedback."""
     
-    return get_ai_response(client, notes, system_message)
+    return map_reduce_ai_response(client, notes, system_message, on_partial)
 
-def analyze_notes_streaming(client, notes):
+def analyze_notes_streaming(client, notes, on_partial=None):
     """Analyze notes using streaming Groq API"""
     system_message = """You are an educational analyst. Analyze the following notes and provide:
     1. Main concepts covered
@@ -153,9 +442,9 @@ def analyze_notes_streaming(client, notes):
     4. Key points to review
     Be specific and constructive in your feedback."""
     
-    return get_ai_response_streaming(client, notes, system_message)
+    return map_reduce_ai_response_streaming(client, notes, system_message, on_partial)
 
-def generate_summary(client, notes, topic=None):
+def generate_summary(client, notes, topic=None, on_partial=None):
     """Generate a summary of notes using the Groq API"""
     if topic:
         system_message = f"""You are a study assistant. Generate a focused summary of the notes specifically about '{topic}'.
@@ -171,9 +460,9 @@ def generate_summary(client, notes, topic=None):
         2. Key points for each topic
         3. Important concepts and their relationships"""
     
-    return get_ai_response(client, notes, system_message)
+    return map_reduce_ai_response(client, notes, system_message, on_partial)
 
-def generate_summary_streaming(client, notes, topic=None):
+def generate_summary_streaming(client, notes, topic=None, on_partial=None):
     """Generate a streaming summary of notes using the Groq API"""
     if topic:
         system_message = f"""You are a study assistant. Generate a focused summary of the notes specifically about '{topic}'.
@@ -189,4 +478,4 @@ def generate_summary_streaming(client, notes, topic=None):
         2. Key points for each topic
         3. Important concepts and their relationships"""
     
-    return get_ai_response_streaming(client, notes, system_message)
+    return map_reduce_ai_response_streaming(client, notes, system_message, on_partial)
@@ -0,0 +1,82 @@
+import json
+
+class JSONArrayStreamParser:
+    def __init__(self):
+        """
+        Initialize an incremental parser for a JSON array of objects that
+        arrives in chunks, possibly wrapped in prose or a ```json fence.
+        Each element is returned as soon as its closing brace arrives, so a
+        malformed or truncated tail doesn't lose the elements before it.
+        """
+        self.started = False  # seen the opening '['
+        self.finished = False  # seen the closing ']'
+        self.depth = 0  # nesting depth inside the array
+        self.in_string = False
+        self.escaped = False
+        self.element = []  # characters of the element being read
+        self.found = 0  # objects read from the current array
+        self.errors = 0  # elements that closed but weren't valid JSON objects
+
+    def feed(self, chunk):
+        """Consume a chunk and return the list of elements it completed"""
+        completed = []
+        for char in chunk:
+            if self.finished:
+                break
+            if not self.started:
+                if char == "[":
+                    self.started = True
+                continue
+
+            if self.depth == 0:
+                # Between elements: skip separators until the next object starts
+                if char == "{":
+                    self.depth = 1
+                    self.element = [char]
+                elif char == "]":
+                    if self.found:
+                        self.finished = True
+                    else:
+                        # A bracket in prose before the JSON ("[multiple choice]"),
+                        # not the array: keep looking for the real one
+                        self.started = False
+                continue
+
+            self.element.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    element = self._parse("".join(self.element))
+                    self.element = []
+                    if element is not None:
+                        self.found += 1
+                        completed.append(element)
+        return completed
+
+    def _parse(self, text):
+        """Return the decoded object, or None (counting an error) if it isn't one"""
+        try:
+            element = json.loads(text)
+        except json.JSONDecodeError:
+            self.errors += 1
+            return None
+        if not isinstance(element, dict):
+            self.errors += 1
+            return None
+        return element
+
+    @property
+    def truncated(self):
+        """True if the stream ended inside an element or before the array closed"""
+        return not self.finished
@@ -0,0 +1,41 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    def __init__(self, maxsize=128):
+        """
+        Initialize a thread-safe least-recently-used cache holding at
+        most `maxsize` entries.
+        """
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Return the cached value for key and mark it as recently used"""
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used entry if full"""
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove and return a cached value"""
+        with self.lock:
+            return self.entries.pop(key, default)
+
+    def clear(self):
+        """Remove every entry"""
+        with self.lock:
+            self.entries.clear()
@@ -1,7 +1,7 @@
 import streamlit as st
 from dotenv import load_dotenv
 import os
-from groq_client import initialize_groq
+from groq_client import get_groq_client
 from ui_components import (
     set_page_config,
     display_header,
@@ -9,11 +9,12 @@ from ui_components import (
 )
 from whiteboard_module import display_whiteboard
 from ai_chat_module import display_ai_chat
-from notes_module import display_notes_main, display_notes_sidebar
+from notes_module import display_notes_main, display_notes_sidebar, get_notes_db
 from exam_module import exam_interface
 from datetime import datetime
 import streamlit.components.v1 as components
 from auth_module import display_login_page, logout  
+from notes_database import NoteIndex
 
 # Load environment variables
 load_dotenv()
@@ -23,15 +24,11 @@ def initialize_session_state():
     if 'messages' not in st.session_state:
         st.session_state.messages = []
     if 'notes' not in st.session_state:
-        st.session_state.notes = []
+        st.session_state.notes = NoteIndex()
     if 'current_note' not in st.session_state:
         st.session_state.current_note = None
     if 'show_analysis' not in st.session_state:
         st.session_state.show_analysis = False
-    if 'exams' not in st.session_state:
-        st.session_state.exams = []
-    if 'exam_results' not in st.session_state:
-        st.session_state.exam_results = []
     if 'current_tab' not in st.session_state:
         st.session_state.current_tab = "Whiteboard"
     if 'prompt_suggestion' not in st.session_state:
@@ -72,8 +69,11 @@ def main():
         display_login_page()
         return
 
-    # Initialize Groq client
-    client = initialize_groq()
+    # Load the user's saved notes
+    get_notes_db()
+
+    # Shared Groq client; its connection pool is reused across reruns and sessions
+    client = get_groq_client()
 
     # App header with logo and title
     display_header()
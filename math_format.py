@@ -0,0 +1,90 @@
+import re
+
+# Words in a prompt that suggest mathematical content
+MATH_KEYWORDS = ("math", "equation", "formula", "symbol", "pi", "π", "sigma", "integral",
+                 "derivative", "calculus", "algebra", "theta", "alpha", "beta", "gamma")
+
+# Math symbols rewritten as LaTeX so streamlit's markdown renders them
+MATH_SYMBOLS = {
+    "pi": "$\\pi$",
+    "π": "$\\pi$",
+    "theta": "$\\theta$",
+    "θ": "$\\theta$",
+    "sigma": "$\\sigma$",
+    "Σ": "$\\Sigma$",
+    "delta": "$\\delta$",
+    "Δ": "$\\Delta$",
+    "alpha": "$\\alpha$",
+    "β": "$\\beta$",
+    "gamma": "$\\gamma$",
+    "lambda": "$\\lambda$",
+    "μ": "$\\mu$",
+    "square root": "$\\sqrt{x}$",
+    "infinity": "$\\infty$"
+}
+
+def _alternation(words):
+    """Return a regex alternation of words, longest first so the longest match wins"""
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+# Keywords match anywhere in the prompt, ignoring case
+MATH_KEYWORD_PATTERN = re.compile(_alternation(MATH_KEYWORDS), re.IGNORECASE)
+
+# A symbol is rewritten when it follows a space and is followed by a space, comma or
+# period. The space is part of the match, which lets the regex engine skip ahead to
+# candidate positions quickly.
+MATH_SYMBOL_PATTERN = re.compile(f" (?:{_alternation(MATH_SYMBOLS)})(?=[ ,.])")
+SPACED_LATEX = {f" {symbol}": f" {latex}" for symbol, latex in MATH_SYMBOLS.items()}
+
+# Unfinished text can only end in a partial match within this many characters of its end
+HOLD_BACK = 1 + max(len(symbol) for symbol in MATH_SYMBOLS)
+
+def is_math_related(text):
+    """Return True if text mentions any math keyword"""
+    return MATH_KEYWORD_PATTERN.search(text) is not None
+
+def _latex_for(match):
+    return SPACED_LATEX[match.group()]
+
+def rewrite_math_symbols(text):
+    """Rewrite every math symbol in text as LaTeX in a single pass"""
+    return MATH_SYMBOL_PATTERN.sub(_latex_for, text)
+
+class MathStreamFormatter:
+    def __init__(self):
+        """
+        Initialize a streaming version of rewrite_math_symbols. Chunks are
+        rewritten as they arrive; only the last few characters, which could
+        be the start of a symbol split across chunks, are held back. The
+        concatenated output equals rewrite_math_symbols of the whole text.
+        """
+        self.pending = ""
+
+    def _release(self, final):
+        """Rewrite and return the pending text that can no longer change"""
+        text = self.pending
+        cut = len(text) if final else max(0, len(text) - HOLD_BACK)
+
+        pieces = []
+        position = 0
+        for match in MATH_SYMBOL_PATTERN.finditer(text):
+            if match.start() >= cut:
+                break
+            pieces.append(text[position:match.start()])
+            pieces.append(SPACED_LATEX[match.group()])
+            position = match.end()
+        # A symbol that started before the cut is released whole
+        cut = max(cut, position)
+        pieces.append(text[position:cut])
+
+        self.pending = text[cut:]
+        return "".join(pieces)
+
+    def feed(self, chunk):
+        """Add a streamed chunk and return the text that is ready to show"""
+        self.pending += chunk
+        return self._release(final=False)
+
+    def finish(self):
+        """Return whatever text is still held back"""
+        return self._release(final=True)
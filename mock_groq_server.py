@@ -0,0 +1,332 @@
+"""
+Local stand-in for the Groq chat completions API, for offline benchmarks
+and load tests. Point the app at it with GROQ_BASE_URL=http://127.0.0.1:8765.
+
+    python mock_groq_server.py --latency 0.4 --chunk-interval 0.02 --error-rate 0.05
+    python mock_groq_server.py --mode record --cassette cassettes/session.jsonl
+    python mock_groq_server.py --mode replay --cassette cassettes/session.jsonl
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+UPSTREAM_URL = "https://api.groq.com"
+
+WORDS = ("notes", "concept", "study", "review", "example", "definition", "process", "theory",
+         "practice", "summary", "key", "idea", "relationship", "step", "result", "method",
+         "evidence", "model", "system", "question", "answer", "detail", "structure", "function")
+
+class MockConfig:
+    def __init__(self, latency=0.3, jitter=0.1, chunk_interval=0.02, words_per_chunk=2,
+                 response_words=150, error_rate=0.0, error_statuses=(429, 500, 503),
+                 retry_after=1.0, mode="mock", cassette=None, replay_timing=True, seed=None):
+        """
+        Initialize the stand-in's behaviour. In "mock" mode responses are
+        synthesized after `latency` (+/- `jitter`) seconds and streamed in
+        chunks of `words_per_chunk` words every `chunk_interval` seconds;
+        `error_rate` of requests fail with one of `error_statuses`. In
+        "record" mode requests are forwarded to Groq and saved to the
+        `cassette` file; in "replay" mode saved responses are served with
+        their recorded timing (or instantly if replay_timing is False).
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_interval = chunk_interval
+        self.words_per_chunk = words_per_chunk
+        self.response_words = response_words
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.mode = mode
+        self.cassette = cassette
+        self.replay_timing = replay_timing
+        self.random = random.Random(seed)
+
+def request_key(body):
+    """Return the cassette key of a chat completion request"""
+    identity = {key: body.get(key) for key in ("model", "messages", "stream")}
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+class Cassette:
+    def __init__(self, path):
+        """
+        Initialize a record/replay cassette: a JSON-lines file with one
+        recorded response per line, keyed by request_key().
+        """
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def get(self, key):
+        with self.lock:
+            return self.entries.get(key)
+
+    def add(self, entry):
+        """Save a recorded response, appending it to the cassette file"""
+        with self.lock:
+            self.entries[entry["key"]] = entry
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+def synthesize_content(body, config):
+    """Return deterministic response text for a request"""
+    system = next((m["content"] for m in body.get("messages", []) if m["role"] == "system"), "")
+    rng = random.Random(request_key(body))
+
+    # Exam generation asks for a JSON array of questions
+    if "JSON array" in system:
+        match = re.search(r"Generate (\d+)", system)
+        count = int(match.group(1)) if match else 5
+        questions = []
+        for i in range(count):
+            options = [f"Option {letter}: {rng.choice(WORDS)}" for letter in "ABCD"]
+            questions.append({
+                "question": f"Question {i + 1}: which {rng.choice(WORDS)} best describes the {rng.choice(WORDS)}?",
+                "options": options,
+                "answer": rng.choice(options),
+                "explanation": " ".join(rng.choice(WORDS) for _ in range(12))
+            })
+        return json.dumps(questions, indent=2)
+
+    return " ".join(rng.choice(WORDS) for _ in range(config.response_words)) + "."
+
+def _completion(body, content, usage):
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": usage
+    }
+
+def _chunk(body, delta, finish_reason=None, usage=None):
+    chunk = {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    if usage is not None:
+        chunk["x_groq"] = {"usage": usage}
+    return chunk
+
+def _usage(body, content):
+    prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages", []))
+    completion_tokens = len(content.split())
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+class MockGroqHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive, like the real API
+    protocol_version = "HTTP/1.1"
+    config = None
+    cassette = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_event(self, data):
+        """Send one server-sent event as an HTTP chunk"""
+        payload = f"data: {data}\n\n".encode()
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.config.mode == "record":
+            self._record(body)
+        elif self.config.mode == "replay":
+            self._replay(body)
+        else:
+            self._mock(body)
+
+    def _mock(self, body):
+        config = self.config
+        time.sleep(max(0.0, config.latency + config.random.uniform(-config.jitter, config.jitter)))
+
+        if config.random.random() < config.error_rate:
+            status = config.random.choice(config.error_statuses)
+            headers = {"retry-after": str(config.retry_after)} if status == 429 else None
+            self._send_json(status, {"error": {"message": f"Injected error {status}", "type": "mock_error"}}, headers)
+            return
+
+        content = synthesize_content(body, config)
+        usage = _usage(body, content)
+        if not body.get("stream"):
+            self._send_json(200, _completion(body, content, usage))
+            return
+
+        self._start_stream()
+        self._write_event(json.dumps(_chunk(body, {"role": "assistant", "content": ""})))
+        words = content.split(" ")
+        for start in range(0, len(words), config.words_per_chunk):
+            piece = " ".join(words[start:start + config.words_per_chunk])
+            if start + config.words_per_chunk < len(words):
+                piece += " "
+            self._write_event(json.dumps(_chunk(body, {"content": piece})))
+            time.sleep(config.chunk_interval)
+        self._write_event(json.dumps(_chunk(body, {}, "stop", usage)))
+        self._write_event("[DONE]")
+        self._end_stream()
+
+    def _replay(self, body):
+        entry = self.cassette.get(request_key(body))
+        if entry is None:
+            self._send_json(404, {"error": {"message": "Request not found in cassette", "type": "cassette_miss"}})
+            return
+        timing = self.config.replay_timing
+        if timing:
+            time.sleep(entry["latency"])
+        if "events" not in entry:
+            self._send_json(entry["status"], entry["body"])
+            return
+
+        self._start_stream()
+        for delay, data in entry["events"]:
+            if timing:
+                time.sleep(delay)
+            self._write_event(data)
+        self._end_stream()
+
+    def _record(self, body):
+        request = urllib.request.Request(
+            UPSTREAM_URL + self.path,
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json",
+                     "Authorization": self.headers.get("Authorization", "")},
+            method="POST"
+        )
+        start = time.monotonic()
+        try:
+            upstream = urllib.request.urlopen(request, timeout=120)
+        except urllib.error.HTTPError as e:
+            # Errors are passed through but not recorded
+            self._send_json(e.code, json.loads(e.read() or b"{}"))
+            return
+        key = request_key(body)
+
+        with upstream:
+            if not body.get("stream"):
+                payload = json.loads(upstream.read())
+                latency = time.monotonic() - start
+                self._send_json(200, payload)
+                self.cassette.add({"key": key, "status": 200, "latency": latency, "body": payload})
+                return
+
+            self._start_stream()
+            events = []
+            latency = None
+            last = start
+            for line in upstream:
+                line = line.decode().strip()
+                if not line.startswith("data: "):
+                    continue
+                now = time.monotonic()
+                if latency is None:
+                    latency = now - start
+                    events.append((0.0, line[6:]))
+                else:
+                    events.append((now - last, line[6:]))
+                last = now
+                self._write_event(line[6:])
+            self._end_stream()
+        self.cassette.add({"key": key, "status": 200, "latency": latency or 0.0, "events": events})
+
+def start_mock_server(config=None, host="127.0.0.1", port=0):
+    """
+    Start the stand-in on a background thread and return the server; its
+    base URL (for GROQ_BASE_URL) is server.url.
+    """
+    config = config or MockConfig()
+    handler = type("ConfiguredMockGroqHandler", (MockGroqHandler,), {
+        "config": config,
+        "cassette": Cassette(config.cassette) if config.mode != "mock" else None
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="mock-groq-server", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mode", choices=("mock", "record", "replay"), default="mock")
+    parser.add_argument("--cassette", help="JSON-lines file for record/replay")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first byte")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--words-per-chunk", type=int, default=2)
+    parser.add_argument("--response-words", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-statuses", default="429,500,503")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--fast-replay", action="store_true", help="ignore recorded timing when replaying")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.mode != "mock" and not args.cassette:
+        parser.error("--cassette is required for record and replay")
+
+    config = MockConfig(
+        latency=args.latency, jitter=args.jitter, chunk_interval=args.chunk_interval,
+        words_per_chunk=args.words_per_chunk, response_words=args.response_words,
+        error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(",")],
+        retry_after=args.retry_after, mode=args.mode, cassette=args.cassette,
+        replay_timing=not args.fast_replay, seed=args.seed
+    )
+    server = start_mock_server(config, args.host, args.port)
+    print(f"Mock Groq server ({args.mode}) at {server.url} - set GROQ_BASE_URL={server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import re
+
+# Markdown headings start a new section; the lookahead keeps the heading with its section
+HEADING_PATTERN = re.compile(r"^(?=#{1,6}\s)", re.MULTILINE)
+PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+def _split_long(text, max_chars):
+    """Split text that is too long for one chunk on paragraphs, then sentences, then characters"""
+    pieces = []
+    for pattern in (PARAGRAPH_PATTERN, SENTENCE_PATTERN):
+        parts = [part.strip() for part in pattern.split(text) if part.strip()]
+        if len(parts) > 1:
+            for part in parts:
+                if len(part) > max_chars:
+                    pieces.extend(_split_long(part, max_chars))
+                else:
+                    pieces.append(part)
+            return pieces
+    return [text[start:start + max_chars] for start in range(0, len(text), max_chars)]
+
+def _pack(pieces, max_chars):
+    """Greedily join consecutive pieces into chunks of at most max_chars"""
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def split_notes(text, max_chars=6000):
+    """
+    Split notes into chunks of at most max_chars, preferring heading
+    boundaries, then paragraphs, then sentences. A section split across
+    chunks repeats its heading so each chunk keeps its context.
+    """
+    pieces = []
+    for section in HEADING_PATTERN.split(text):
+        section = section.strip()
+        if not section:
+            continue
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+
+        heading = ""
+        if section.startswith("#"):
+            heading, _, section = section.partition("\n")
+            heading = heading.strip()
+        budget = max_chars - len(f"{heading} (continued)") - 2 if heading else max_chars
+        for index, chunk in enumerate(_pack(_split_long(section, budget), budget)):
+            if heading:
+                label = heading if index == 0 else f"{heading} (continued)"
+                chunk = f"{label}\n\n{chunk}"
+            pieces.append(chunk)
+    return _pack(pieces, max_chars)
@@ -0,0 +1,216 @@
+import json
+import time
+import zlib
+from difflib import SequenceMatcher
+from note_record import content_hash
+from lru_cache import LRUCache
+
+def encode_delta(base, content):
+    """Return a line-level delta that rebuilds content from base"""
+    base_lines = base.splitlines(keepends=True)
+    new_lines = content.splitlines(keepends=True)
+    ops = []
+    matcher = SequenceMatcher(None, base_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])  # copy a run of lines from the base
+        elif j2 > j1:
+            ops.append("".join(new_lines[j1:j2]))  # insert new text
+    return ops
+
+def apply_delta(base, ops):
+    """Rebuild a version's content by applying a delta to its base"""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if isinstance(op, list):
+            parts.extend(base_lines[op[0]:op[1]])
+        else:
+            parts.append(op)
+    return "".join(parts)
+
+class NoteHistory:
+    def __init__(self, store, keyframe_interval=20, keep_recent=50,
+                 thin_interval=24 * 60 * 60, max_age=None):
+        """
+        Initialize a version history for notes kept in the store's SQLite
+        database. Every `keyframe_interval` versions a full compressed copy
+        is stored; the versions in between are compressed line deltas
+        against the previous version, so storage grows with the size of
+        each edit rather than the size of the note.
+
+        Retention: the `keep_recent` newest versions are always kept, older
+        versions are thinned to one per `thin_interval` seconds, and
+        versions older than `max_age` seconds (if set) are dropped.
+        """
+        self.store = store
+        self.keyframe_interval = keyframe_interval
+        self.keep_recent = keep_recent
+        self.thin_interval = thin_interval
+        self.max_age = max_age
+        self.latest = LRUCache(64)  # note_id -> (version, content, chain length)
+        self._create_versions_table()
+
+    def _create_versions_table(self):
+        """
+        Create the note versions table if it doesn't exist
+        """
+        with self.store.lock, self.store.conn:
+            self.store.conn.execute('''
+                CREATE TABLE IF NOT EXISTS note_versions (
+                    note_id INTEGER NOT NULL,
+                    version INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    is_keyframe INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (note_id, version)
+                )
+            ''')
+
+    def _rows(self, note_id, columns='*'):
+        """Return a note's version rows, oldest first"""
+        with self.store.lock:
+            return self.store.conn.execute(
+                f'SELECT {columns} FROM note_versions WHERE note_id = ? ORDER BY version',
+                (note_id,)
+            ).fetchall()
+
+    def _rebuild(self, rows):
+        """Rebuild the content of the last row from its nearest preceding keyframe"""
+        start = max(i for i, row in enumerate(rows) if row["is_keyframe"])
+        content = zlib.decompress(rows[start]["data"]).decode()
+        for row in rows[start + 1:]:
+            content = apply_delta(content, json.loads(zlib.decompress(row["data"])))
+        return content, len(rows) - start - 1
+
+    def _latest(self, note_id):
+        """Return (version, content, chain length) for a note's newest version, or None"""
+        cached = self.latest.get(note_id)
+        if cached is not None:
+            return cached
+
+        with self.store.lock:
+            keyframe = self.store.conn.execute(
+                'SELECT MAX(version) AS version FROM note_versions WHERE note_id = ? AND is_keyframe = 1',
+                (note_id,)
+            ).fetchone()
+            if keyframe["version"] is None:
+                return None
+            rows = self.store.conn.execute(
+                'SELECT * FROM note_versions WHERE note_id = ? AND version >= ? ORDER BY version',
+                (note_id, keyframe["version"])
+            ).fetchall()
+
+        content, chain = self._rebuild(rows)
+        latest = (rows[-1]["version"], content, chain)
+        self.latest.put(note_id, latest)
+        return latest
+
+    def _encode(self, previous, content, chain):
+        """Return (is_keyframe, data) for a new version following `previous`"""
+        keyframe = zlib.compress(content.encode())
+        if previous is None or chain + 1 >= self.keyframe_interval:
+            return True, keyframe
+        delta = zlib.compress(json.dumps(encode_delta(previous, content)).encode())
+        # Fall back to a keyframe when the edit rewrote most of the note
+        if len(delta) >= len(keyframe):
+            return True, keyframe
+        return False, delta
+
+    def record(self, note_id, content, timestamp=None):
+        """Store a new version of a note if its content changed. Returns the version number or None"""
+        latest = self._latest(note_id)
+        if latest is not None and latest[1] == content:
+            return None
+
+        version = latest[0] + 1 if latest else 1
+        chain = latest[2] if latest else 0
+        is_keyframe, data = self._encode(latest[1] if latest else None, content, chain)
+
+        with self.store.lock, self.store.conn:
+            self.store.conn.execute(
+                'INSERT INTO note_versions (note_id, version, created, is_keyframe, content_hash, data) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (note_id, version, timestamp or time.time(), int(is_keyframe), content_hash(content), data)
+            )
+        self.latest.put(note_id, (version, content, 0 if is_keyframe else chain + 1))
+
+        # Compact once the history has grown well past what retention keeps
+        if version % self.keep_recent == 0:
+            self.compact(note_id)
+        return version
+
+    def record_many(self, notes):
+        """Record a version for each note in a committed batch"""
+        for note in notes:
+            self.record(note["id"], note["content"], note["last_edited"])
+
+    def list_versions(self, note_id):
+        """Return metadata for each stored version of a note, newest first"""
+        rows = self._rows(note_id, 'version, created, is_keyframe, length(data) AS size')
+        return [dict(row) for row in reversed(rows)]
+
+    def get_version(self, note_id, version):
+        """Reconstruct the content of a note at the given version, or None if it isn't stored"""
+        with self.store.lock:
+            rows = self.store.conn.execute('''
+                SELECT * FROM note_versions
+                WHERE note_id = ? AND version <= ? AND version >= (
+                    SELECT MAX(version) FROM note_versions
+                    WHERE note_id = ? AND version <= ? AND is_keyframe = 1
+                )
+                ORDER BY version
+            ''', (note_id, version, note_id, version)).fetchall()
+        if not rows or rows[-1]["version"] != version:
+            return None
+        return self._rebuild(rows)[0]
+
+    def _retained(self, rows, now):
+        """Return the version numbers the retention policy keeps"""
+        keep = {row["version"] for row in rows[-self.keep_recent:]}
+        seen_buckets = set()
+        for row in reversed(rows[:-self.keep_recent]):
+            if self.max_age is not None and now - row["created"] > self.max_age:
+                continue
+            bucket = int(row["created"] // self.thin_interval)
+            if bucket not in seen_buckets:
+                seen_buckets.add(bucket)
+                keep.add(row["version"])
+        return keep
+
+    def compact(self, note_id, now=None):
+        """Apply the retention policy to a note and re-encode the surviving versions. Returns versions dropped"""
+        rows = self._rows(note_id, 'version, created')
+        keep = self._retained(rows, now or time.time())
+        if len(keep) == len(rows):
+            return 0
+
+        # Rebuild the surviving versions, then rewrite them as a fresh keyframe/delta chain
+        survivors = [
+            (row["version"], row["created"], self.get_version(note_id, row["version"]))
+            for row in rows if row["version"] in keep
+        ]
+        new_rows = []
+        previous, chain = None, 0
+        for version, created, content in survivors:
+            is_keyframe, data = self._encode(previous, content, chain)
+            chain = 0 if is_keyframe else chain + 1
+            previous = content
+            new_rows.append((note_id, version, created, int(is_keyframe), content_hash(content), data))
+
+        with self.store.lock, self.store.conn:
+            self.store.conn.execute('DELETE FROM note_versions WHERE note_id = ?', (note_id,))
+            self.store.conn.executemany(
+                'INSERT INTO note_versions (note_id, version, created, is_keyframe, content_hash, data) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                new_rows
+            )
+        self.latest.put(note_id, (survivors[-1][0], previous, chain))
+        return len(rows) - len(survivors)
+
+    def delete(self, note_id):
+        """Remove every stored version of a note"""
+        with self.store.lock, self.store.conn:
+            self.store.conn.execute('DELETE FROM note_versions WHERE note_id = ?', (note_id,))
+        self.latest.pop(note_id)
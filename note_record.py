@@ -0,0 +1,89 @@
+import hashlib
+
+NOTE_FIELDS = ("id", "title", "content", "created", "last_edited")
+
+def content_hash(content):
+    """Return a short, stable hash of a note's content"""
+    return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
+
+class NoteRecord:
+    __slots__ = ("id", "title", "created", "last_edited", "content_length", "content_hash", "_content", "_loader")
+
+    def __init__(self, id=None, title="", content=None, created=0.0, last_edited=0.0,
+                 content_length=0, content_hash=None, loader=None):
+        """
+        Initialize a compact note record. Only metadata is kept resident;
+        when a loader is given the content can be released and is fetched
+        on demand with loader(note_id). Records support the same item access
+        as the plain note dicts they replace (note["title"], note.get(...)).
+        """
+        self.id = id
+        self.title = title
+        self.created = created
+        self.last_edited = last_edited
+        self.content_length = content_length
+        self.content_hash = content_hash
+        self._content = None
+        self._loader = loader
+        if content is not None:
+            self.content = content
+
+    @classmethod
+    def from_dict(cls, note, loader=None):
+        """Build a record from a note dictionary"""
+        return cls(
+            id=note.get("id"),
+            title=note.get("title", ""),
+            content=note.get("content", ""),
+            created=note.get("created", 0.0),
+            last_edited=note.get("last_edited", 0.0),
+            loader=loader
+        )
+
+    @property
+    def content(self):
+        if self._content is None and self._loader is not None:
+            return self._loader(self.id)
+        return self._content or ""
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        self.content_length = len(value)
+        self.content_hash = content_hash(value)
+
+    @property
+    def is_resident(self):
+        """True if the content is currently held in memory by the record"""
+        return self._content is not None
+
+    def release_content(self):
+        """Drop the resident content so it is reloaded on demand; returns the dropped content"""
+        if self._loader is None:
+            return None
+        content, self._content = self._content, None
+        return content
+
+    def keys(self):
+        return NOTE_FIELDS
+
+    def __contains__(self, key):
+        return key in NOTE_FIELDS
+
+    def __getitem__(self, key):
+        if key not in NOTE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in NOTE_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        """Return a field's value, or default if the field doesn't exist"""
+        return self[key] if key in NOTE_FIELDS else default
+
+    def to_dict(self):
+        """Return the note as a plain dictionary, content included"""
+        return {key: self[key] for key in NOTE_FIELDS}
@@ -0,0 +1,66 @@
+from bisect import bisect_left, insort
+
+VIEWS = ("recent", "alphabetical")
+
+class SortedNoteViews:
+    def __init__(self):
+        """
+        Initialize ordered indexes over note metadata: one by last edited
+        time (newest first) and one by title. Both are kept sorted as notes
+        change, so a page of any view is a slice rather than a full sort.
+        """
+        self.orders = {view: [] for view in VIEWS}  # view -> sorted list of (key, note_id)
+        self.keys = {}  # note_id -> {view: key}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _keys_for(self, note):
+        """Return the sort key of a note in each view"""
+        return {
+            "recent": -note["last_edited"],
+            "alphabetical": note["title"].lower()
+        }
+
+    def add_note(self, note):
+        """Insert a note, or move it to its new position if its title or timestamp changed"""
+        note_id = note["id"]
+        new_keys = self._keys_for(note)
+        old_keys = self.keys.get(note_id)
+        for view in VIEWS:
+            if old_keys is not None:
+                if old_keys[view] == new_keys[view]:
+                    continue
+                self._discard(view, old_keys[view], note_id)
+            insort(self.orders[view], (new_keys[view], note_id))
+        self.keys[note_id] = new_keys
+
+    def remove_note(self, note_id):
+        """Remove a note from every view"""
+        old_keys = self.keys.pop(note_id, None)
+        if old_keys is None:
+            return
+        for view in VIEWS:
+            self._discard(view, old_keys[view], note_id)
+
+    def _discard(self, view, key, note_id):
+        """Remove one entry from a view using binary search"""
+        order = self.orders[view]
+        index = bisect_left(order, (key, note_id))
+        if index < len(order) and order[index] == (key, note_id):
+            del order[index]
+
+    def page(self, view="recent", page=0, page_size=20, only=None):
+        """
+        Return (note_ids, total) for one page of a view. If `only` is a set
+        of note IDs, the view is filtered to those notes.
+        """
+        start = page * page_size
+        if only is None:
+            order = self.orders[view]
+            return [note_id for _, note_id in order[start:start + page_size]], len(order)
+
+        # Only the matching notes are sorted, so typical filters stay cheap
+        ids = [note_id for note_id in only if note_id in self.keys]
+        ids.sort(key=lambda note_id: (self.keys[note_id][view], note_id))
+        return ids[start:start + page_size], len(ids)
@@ -1,13 +1,95 @@
+import hashlib
 import json
+import os
+import tempfile
+import threading
 from datetime import datetime, timedelta
+from autosave import AutoSaveWriter
+from search_index import NoteSearchIndex, StoreSubstringIndex, make_snippet
+from notes_store import SQLiteNotesStore
+from notes_ndjson import iter_notes_file, write_ndjson
+from note_record import NoteRecord
+from lru_cache import LRUCache
+from note_history import NoteHistory
+from note_views import SortedNoteViews
+from semantic_index import SemanticIndex
+
+# Per-user databases shared across sessions, keyed by database path
+_user_databases = {}
+_user_databases_lock = threading.Lock()
+
+class NoteIndex:
+    def __init__(self, notes=None, next_id=0):
+        """
+        Initialize an ID-keyed collection of notes. Lookups, replacements
+        and removals by ID are constant time, iteration follows insertion
+        order, and new IDs come from a monotonic counter so they are never
+        reused after a note is deleted.
+        """
+        self.by_id = {}
+        self.next_id = next_id
+        for note in notes or []:
+            self.add(note)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __contains__(self, note_id):
+        return note_id in self.by_id
+
+    def get(self, note_id):
+        """Retrieve a note by its ID, or None if it doesn't exist"""
+        return self.by_id.get(note_id)
+
+    def allocate_id(self):
+        """Reserve and return the next unused note ID"""
+        note_id = self.next_id
+        self.next_id += 1
+        return note_id
+
+    def add(self, note):
+        """Add a note, allocating an ID for it if it doesn't have one"""
+        if note.get("id") is None:
+            note["id"] = self.allocate_id()
+        else:
+            self.next_id = max(self.next_id, note["id"] + 1)
+        self.by_id[note["id"]] = note
+        return note
+
+    def remove(self, note_id):
+        """Remove and return a note by its ID, or None if it doesn't exist"""
+        return self.by_id.pop(note_id, None)
 
 class NotesDatabase:
-    def __init__(self):
+    def __init__(self, store=None, content_cache_size=32):
         """
         Initialize a dummy database for notes with some sample content
-        to simulate a real-world note-taking application.
+        to simulate a real-world note-taking application. If a store is
+        given, notes are loaded from it and every change is written back
+        to it one row at a time. Store-backed notes keep only their
+        metadata in memory and load content on demand through a small
+        LRU cache.
         """
-        self.notes = [
+        self.store = store
+        self.writer = None
+        self.json_filename = 'notes_database.json'
+        self.lock = threading.Lock()
+        self.index_lock = threading.Lock()
+        self.content_cache = LRUCache(content_cache_size)
+        self.history = NoteHistory(store) if store is not None else None
+        if store is not None:
+            records = (
+                NoteRecord(loader=self._load_content, **metadata)
+                for metadata in store.load_metadata()
+            )
+            self.notes = NoteIndex(records, int(store.get_meta('next_id', 0)))
+            self.rebuild_indexes()
+            return
+
+        self.notes = self._make_index([
             {
                 "id": 0,
                 "title": "Machine Learning Basics",
@@ -59,59 +141,314 @@ def function_name(parameters):
                 "created": datetime.now().timestamp() - timedelta(days=10).total_seconds(),
                 "last_edited": datetime.now().timestamp() - timedelta(days=3).total_seconds()
             }
-        ]
+        ])
+        self.rebuild_indexes()
+    
+    def _make_index(self, notes):
+        """Build a NoteIndex of in-memory records from note dictionaries"""
+        return NoteIndex(NoteRecord.from_dict(note) for note in notes)
+    
+    def _load_content(self, note_id):
+        """Fetch a note's content from the store, going through the LRU cache"""
+        content = self.content_cache.get(note_id)
+        if content is None:
+            content = self.store.get_content(note_id) or ""
+            self.content_cache.put(note_id, content)
+        return content
+    
+    def _release_committed(self, notes):
+        """Drop the resident content of records whose latest version has been committed"""
+        with self.lock:
+            for committed in notes:
+                record = self.notes.get(committed["id"])
+                if record is not None and record.last_edited == committed["last_edited"]:
+                    self.substring_index.committed(record.id)
+                    content = record.release_content()
+                    if content is not None:
+                        self.content_cache.put(record.id, content)
+    
+    def rebuild_indexes(self):
+        """
+        Rebuild the search indexes and sorted views from the current notes.
+        The views only need metadata and are built at once. Store-backed
+        databases answer substring searches from the store's full-text
+        table, and build the word and semantic indexes on a background
+        thread, so opening one doesn't block on reading every note;
+        searches wait until the build finishes.
+        """
+        self.views = SortedNoteViews()
+        for note in self.notes:
+            self.views.add_note(note)
+        substring_index = StoreSubstringIndex(self.store, self.get_note_by_id) if self.store is not None else None
+        self.search_index = NoteSearchIndex(self.get_note_by_id, substring_index=substring_index)
+        self.substring_index = self.search_index.substring_index
+        self.semantic_index = SemanticIndex()
+        self.indexes_ready = threading.Event()
+        self.indexed_during_build = set()  # IDs indexed by edits while the build runs
+        if self.store is None:
+            self._build_indexes(self.notes)
+            return
+        # Store-backed records don't hold their content, so stream it from the store instead
+        threading.Thread(
+            target=self._build_indexes, args=(self.store.iter_notes(),),
+            name="notes-index-build", daemon=True
+        ).start()
+    
+    def _build_indexes(self, notes):
+        """Add notes to the word and semantic indexes, skipping any an edit already indexed"""
+        try:
+            for note in notes:
+                with self.index_lock:
+                    if note["id"] in self.indexed_during_build or note["id"] not in self.notes:
+                        continue
+                    self.search_index.add_note(note)
+                    self.semantic_index.add_note(note)
+        finally:
+            with self.index_lock:
+                self.indexed_during_build.clear()
+                self.indexes_ready.set()
+    
+    def _index_note(self, note, previous=None):
+        """Index a new or changed note; `previous` is its last indexed title and content, if known"""
+        with self.index_lock:
+            if not self.indexes_ready.is_set():
+                self.indexed_during_build.add(note["id"])
+            self.search_index.add_note(note, previous)
+            self.semantic_index.add_note(note)
+            self.views.add_note(note)
+    
+    def _unindex_note(self, note):
+        """Remove a deleted note from every index"""
+        with self.index_lock:
+            if not self.indexes_ready.is_set():
+                self.indexed_during_build.add(note["id"])
+            self.search_index.remove_note(note["id"], note)
+            self.semantic_index.remove_note(note["id"])
+            self.views.remove_note(note["id"])
+    
+    def enable_autosave(self, delay=1.0):
+        """Route note changes through a background writer that coalesces rapid edits"""
+        with self.lock:
+            if self.writer is None:
+                self.writer = AutoSaveWriter(self.save_notes, delay)
+        return self.writer
+    
+    def save_notes(self, notes):
+        """Durably commit a batch of changed notes in one atomic write"""
+        if self.store is not None:
+            self.store.upsert_notes(notes)
+            self.history.record_many(notes)
+            self._release_committed(notes)
+        else:
+            self.to_json(self.json_filename)
+    
+    def _persist(self, note):
+        """Save a changed note through the autosave writer or straight to the store"""
+        if self.store is not None:
+            # Until it is committed the store's full-text table has the old version
+            self.substring_index.changed(note.id)
+        if self.writer is not None:
+            with self.lock:
+                snapshot = note.to_dict()
+            self.writer.submit(snapshot)
+        elif self.store is not None:
+            self.save_notes([note.to_dict()])
     
     def get_note_by_id(self, note_id):
         """Retrieve a note by its ID"""
-        for note in self.notes:
-            if note['id'] == note_id:
-                return note
-        return None
+        return self.notes.get(note_id)
     
     def add_note(self, title="Untitled Document", content=""):
         """Add a new note to the database"""
-        new_note = {
-            "id": len(self.notes),
-            "title": title,
-            "content": content,
-            "created": datetime.now().timestamp(),
-            "last_edited": datetime.now().timestamp()
-        }
-        self.notes.append(new_note)
+        # Store-backed IDs are reserved in the store, so other instances on the same file can't reuse them
+        if self.store is not None:
+            note_id = self.store.allocate_id(self.notes.next_id)
+        else:
+            note_id = self.notes.allocate_id()
+        new_note = NoteRecord(
+            id=note_id,
+            title=title,
+            content=content,
+            created=datetime.now().timestamp(),
+            last_edited=datetime.now().timestamp(),
+            loader=self._load_content if self.store is not None else None
+        )
+        self.notes.add(new_note)
+        self._index_note(new_note)
+        self._persist(new_note)
         return new_note
     
     def update_note(self, note_id, title=None, content=None):
         """Update an existing note"""
-        for note in self.notes:
-            if note['id'] == note_id:
-                if title is not None:
-                    note['title'] = title
-                if content is not None:
-                    note['content'] = content
-                note['last_edited'] = datetime.now().timestamp()
-                return note
-        return None
-    
-    def search_notes(self, query):
-        """Search notes by title or content"""
+        note = self.notes.get(note_id)
+        if note is None:
+            return None
+        # The in-memory trigram index diffs against the old version; the store's needs no help
+        previous = note.to_dict() if self.store is None else None
+        with self.lock:
+            if title is not None:
+                note['title'] = title
+            if content is not None:
+                note['content'] = content
+                self.content_cache.pop(note_id)
+            note['last_edited'] = datetime.now().timestamp()
+        self._index_note(note, previous)
+        self._persist(note)
+        return note
+    
+    def delete_note(self, note_id):
+        """Delete a note; its ID is never handed out again"""
+        note = self.notes.remove(note_id)
+        if note is None:
+            return None
+        self._unindex_note(note)
+        self.content_cache.pop(note_id)
+        if self.writer is not None:
+            self.writer.flush()
+        if self.store is not None:
+            self.store.delete_note(note_id)
+            self.store.reserve_ids(self.notes.next_id)
+            self.history.delete(note_id)
+        return note
+    
+    def get_note_versions(self, note_id):
+        """List the saved versions of a note, newest first"""
+        if self.history is None:
+            return []
+        return self.history.list_versions(note_id)
+    
+    def restore_version(self, note_id, version):
+        """Replace a note's content with one of its earlier versions"""
+        content = self.history.get_version(note_id, version) if self.history else None
+        if content is None:
+            return None
+        return self.update_note(note_id, content=content)
+    
+    def list_notes(self, view="recent", page=0, page_size=20, query=None):
+        """
+        Return (notes, total) for one page of notes ordered by the given view
+        ("recent" or "alphabetical"), optionally filtered to notes containing query
+        """
+        with self.index_lock:
+            only = self.substring_index.search(query) if query else None
+            note_ids, total = self.views.page(view, page, page_size, only)
+        return [self.notes.get(note_id) for note_id in note_ids], total
+    
+    def _ranked(self, index, query, limit):
+        """Search a word or semantic index once it is built; returns (note_id, score) tuples"""
+        self.indexes_ready.wait()
+        with self.index_lock:
+            return index.search(query, limit)
+    
+    def search_notes(self, query, limit=None):
+        """Search notes by title or content; substring matches first, ranked by BM25"""
+        return [
+            self.get_note_by_id(note_id)
+            for note_id, _ in self._ranked(self.search_index, query, limit)
+        ]
+    
+    def search_notes_with_snippets(self, query, limit=None):
+        """Search notes and return each match with its BM25 score and a highlighted snippet"""
+        results = []
+        for note_id, score in self._ranked(self.search_index, query, limit):
+            note = self.get_note_by_id(note_id)
+            results.append({
+                "note": note,
+                "score": score,
+                "snippet": make_snippet(note['content'], query)
+            })
+        return results
+    
+    def semantic_search(self, query, limit=10):
+        """Find conceptually related notes; returns a list of (note, similarity) tuples"""
         return [
-            note for note in self.notes 
-            if query.lower() in note['title'].lower() or 
-               query.lower() in note['content'].lower()
+            (self.get_note_by_id(note_id), score)
+            for note_id, score in self._ranked(self.semantic_index, query, limit)
         ]
     
     def to_json(self, filename='notes_database.json'):
-        """Export notes to a JSON file"""
-        with open(filename, 'w') as f:
-            json.dump(self.notes, f, indent=4)
+        """Export notes to a JSON file, atomically replacing any previous version"""
+        # Write to a temporary file first so a crash never leaves a truncated file behind
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.notes-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump([note.to_dict() for note in self.notes], f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, filename)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    
+    def export_ndjson(self, filename='notes_database.ndjson'):
+        """Stream notes to a newline-delimited JSON file. Returns the number written"""
+        if self.writer is not None:
+            self.writer.flush()
+        if self.store is not None:
+            return write_ndjson(self.store.iter_notes(), filename)
+        return write_ndjson(self.notes, filename)
+    
+    def import_ndjson(self, filename, batch_size=500, progress=None):
+        """
+        Incrementally import notes from a JSON array or NDJSON file, writing
+        them to the store in batches. progress(notes_read, bytes_read, total_bytes)
+        is called as the file is consumed. Returns the number of notes imported.
+        """
+        loader = self._load_content if self.store is not None else None
+        
+        def index_notes():
+            for note in iter_notes_file(filename, progress):
+                # A re-imported in-memory note replaces a record that still holds its old content
+                previous = self.notes.get(note.get("id")) if self.store is None else None
+                record = self.notes.add(NoteRecord.from_dict(note, loader))
+                self._index_note(record, previous)
+                snapshot = record.to_dict()
+                # Store-backed records only keep metadata; the batch writes the content
+                record.release_content()
+                self.content_cache.pop(record.id)
+                yield snapshot
+        
+        if self.store is not None:
+            count = self.store.import_notes(index_notes(), batch_size)
+            self.store.reserve_ids(self.notes.next_id)
+            return count
+        return sum(1 for _ in index_notes())
     
     @classmethod
     def from_json(cls, filename='notes_database.json'):
-        """Import notes from a JSON file"""
+        """Import notes from a JSON array or NDJSON file"""
         database = cls()
+        database.json_filename = filename
         try:
-            with open(filename, 'r') as f:
-                database.notes = json.load(f)
+            database.notes = database._make_index(iter_notes_file(filename))
+            database.rebuild_indexes()
             return database
         except FileNotFoundError:
-            return database
\ No newline at end of file
+            return database
+    
+    @classmethod
+    def from_sqlite(cls, db_path='notes.db', json_filename='notes_database.json'):
+        """Open a SQLite-backed database, migrating the legacy JSON file on first use"""
+        store = SQLiteNotesStore(db_path)
+        if json_filename is not None:
+            store.migrate_from_json(json_filename)
+        return cls(store=store)
+    
+    @classmethod
+    def for_user(cls, username, directory='user_notes'):
+        """
+        Return the SQLite-backed notes database belonging to a user. It is
+        opened (and its indexes built) once per process and shared by all of
+        the user's sessions, so they see the same notes and autosave writer.
+        Only note metadata is read up front; the indexes build in the background.
+        """
+        user_key = hashlib.sha256(username.encode()).hexdigest()[:16]
+        db_path = os.path.join(directory, f"{user_key}.db")
+        with _user_databases_lock:
+            database = _user_databases.get(db_path)
+            if database is None:
+                os.makedirs(directory, exist_ok=True)
+                database = cls.from_sqlite(db_path, json_filename=None)
+                _user_databases[db_path] = database
+        return database
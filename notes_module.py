@@ -1,7 +1,11 @@
 import streamlit as st
+import os
 from datetime import datetime
-from ui_components import create_doc_toolbar, format_last_edited
-from groq_client import analyze_notes, generate_summary
+from ui_components import create_doc_toolbar, format_last_edited, paginate, write_ai_stream
+from groq_client import analyze_notes_streaming, generate_summary_streaming
+from notes_database import NotesDatabase
+from search_index import make_snippet
+from token_budget import count_note_tokens
 
 # Import the study material generation functions
 from study_materials import (
@@ -13,26 +17,76 @@ from study_materials import (
 # Import the new text-to-speech functionality
 from text_to_speech import add_text_to_speech_to_notes
 
+# Number of documents listed per sidebar page
+NOTES_PAGE_SIZE = 20
+
+def get_notes_db():
+    """Return the logged-in user's notes database, opening it on first use"""
+    if 'notes_db' not in st.session_state:
+        notes_db = NotesDatabase.for_user(st.session_state.username)
+        notes_db.enable_autosave(delay=float(os.getenv("NOTES_AUTOSAVE_DELAY", "1.0")))
+        st.session_state.notes_db = notes_db
+        st.session_state.notes = notes_db.notes
+    return st.session_state.notes_db
+
+@st.fragment(run_every="1s")
+def display_save_status(note_id):
+    """Show whether the note's latest edits have been committed to disk"""
+    writer = get_notes_db().writer
+    saved_at = writer.last_saved(note_id)
+    if writer.is_pending(note_id):
+        st.caption("Saving...")
+    elif saved_at is not None:
+        st.caption(f"✓ Saved {datetime.fromtimestamp(saved_at).strftime('%I:%M %p')}")
+
+def show_part_progress():
+    """
+    Return an on_partial callback for the AI tools that lists each part of a
+    long note as it is condensed; short notes never call it, so nothing shows
+    """
+    progress = {"done": 0}
+    
+    def on_partial(index, count, text):
+        if "status" not in progress:
+            progress["status"] = st.status(f"Reading this note in {count} parts...")
+        progress["done"] += 1
+        status = progress["status"]
+        status.markdown(f"**Part {index + 1} of {count}**\n\n{text}")
+        if progress["done"] == count:
+            status.update(label=f"Read all {count} parts", state="complete", expanded=False)
+        else:
+            status.update(label=f"Read {progress['done']} of {count} parts...")
+    
+    return on_partial
+
 def display_notes_sidebar():
     """Display the notes sidebar"""
     st.subheader("My Documents")
     
     # New document button with better styling
     if st.button("➕ New Document", type="primary", use_container_width=True):
-        new_note = {
-            "title": "Untitled Document",
-            "content": "",
-            "created": datetime.now().timestamp(),
-            "last_edited": datetime.now().timestamp(),
-            "id": len(st.session_state.notes)
-        }
-        st.session_state.notes.append(new_note)
+        new_note = get_notes_db().add_note()
         st.session_state.current_note = new_note["id"]
     
-    # List of existing documents
+    # List of existing documents, one page at a time
+    notes_db = get_notes_db()
     if st.session_state.notes:
         st.divider()
-        for note in st.session_state.notes:
+        view_labels = {"Recent": "recent", "A-Z": "alphabetical"}
+        view = st.radio("Sort by:", list(view_labels), horizontal=True, key="notes_view")
+        title_filter = st.text_input("Filter documents...", key="notes_filter")
+        
+        # Go back to the first page whenever the view or filter changes
+        view_state = (view, title_filter)
+        if st.session_state.get("notes_view_state") != view_state:
+            st.session_state.notes_view_state = view_state
+            st.session_state.notes_page = 0
+        page = st.session_state.get("notes_page", 0)
+        
+        page_notes, total = notes_db.list_notes(
+            view_labels[view], page, NOTES_PAGE_SIZE, query=title_filter or None
+        )
+        for note in page_notes:
             note_selected = st.button(
                 f"📄 {note['title']}",
                 key=f"doc_{note['id']}",
@@ -42,6 +96,11 @@ def display_notes_sidebar():
                 st.session_state.current_note = note["id"]
             # Display last edited time in smaller text
             st.caption(f"{format_last_edited(note['last_edited'])}")
+        
+        # Pagination controls
+        paginate("notes_page", page, total, NOTES_PAGE_SIZE)
+        if not page_notes:
+            st.info("No documents match this filter.")
     else:
         st.info("No documents yet. Click '➕ New Document' to get started!")
             
@@ -51,16 +110,21 @@ def display_notes_sidebar():
     
     # Search through notes
     search_query = st.text_input("🔍 Search in notes...")
+    semantic = st.toggle("Match related concepts", help="Find notes about similar ideas, even without the exact words")
     if search_query:
         st.markdown("### Search Results")
-        found_notes = False
-        for note in st.session_state.notes:
-            if search_query.lower() in note['content'].lower() or search_query.lower() in note['title'].lower():
-                if st.button(f"🔍 {note['title']}", key=f"search_{note['id']}", use_container_width=True):
-                    st.session_state.current_note = note["id"]
-                found_notes = True
+        # The first search after opening the notes may wait for the indexes to finish building
+        with st.spinner("Searching..."):
+            if semantic:
+                results = [note for note, _ in get_notes_db().semantic_search(search_query, limit=20)]
+            else:
+                results = get_notes_db().search_notes(search_query, limit=20)
+        for note in results:
+            if st.button(f"🔍 {note['title']}", key=f"search_{note['id']}", use_container_width=True):
+                st.session_state.current_note = note["id"]
+            st.caption(make_snippet(note['content'], search_query))
         
-        if not found_notes:
+        if not results:
             st.info("No matching notes found.")
 
 def display_notes_main(client):
@@ -70,11 +134,7 @@ def display_notes_main(client):
     
     with col1:
         if st.session_state.current_note is not None:
-            current_note = next(
-                (note for note in st.session_state.notes 
-                 if note["id"] == st.session_state.current_note), 
-                None
-            )
+            current_note = st.session_state.notes.get(st.session_state.current_note)
             
             if current_note:
                 # Document toolbar
@@ -97,18 +157,32 @@ def display_notes_main(client):
                     placeholder="Start typing your notes here..."
                 )
                 
-                # Auto-save functionality
+                # Auto-save functionality; the background writer coalesces rapid edits
                 if new_title != current_note["title"] or new_content != current_note["content"]:
-                    current_note["title"] = new_title
-                    current_note["content"] = new_content
-                    current_note["last_edited"] = datetime.now().timestamp()
-                    st.session_state.notes = [
-                        note if note["id"] != current_note["id"] else current_note 
-                        for note in st.session_state.notes
-                    ]
-                    
-                    # Show a saved indicator
-                    st.caption(f"✓ Saved {datetime.now().strftime('%I:%M %p')}")
+                    get_notes_db().update_note(current_note["id"], title=new_title, content=new_content)
+                
+                # Show a saved indicator once the commit has landed
+                display_save_status(current_note["id"])
+                st.caption(f"~{count_note_tokens(current_note):,} tokens")
+                
+                # Version history
+                with st.expander("Version History"):
+                    versions = get_notes_db().get_note_versions(current_note["id"])
+                    if versions:
+                        saved_times = {v["version"]: v["created"] for v in versions}
+                        version = st.selectbox(
+                            "Restore an earlier version:",
+                            list(saved_times),
+                            format_func=lambda v: f"Version {v} - {format_last_edited(saved_times[v])}",
+                            key=f"version_{current_note['id']}"
+                        )
+                        if st.button("Restore Version", use_container_width=True):
+                            get_notes_db().restore_version(current_note["id"], version)
+                            # Drop the editor's widget state so it shows the restored content
+                            st.session_state.pop(f"content_{current_note['id']}", None)
+                            st.rerun()
+                    else:
+                        st.caption("No saved versions yet.")
         else:
             # Welcome message when no note is selected
             st.info("👈 Select a document from the sidebar or create a new one to get started.")
@@ -118,32 +192,25 @@ def display_notes_main(client):
         if st.session_state.current_note is not None:
             st.markdown("### AI Study Tools")
             
-            current_note = next(
-                (note for note in st.session_state.notes 
-                 if note["id"] == st.session_state.current_note),
-                None
-            )
+            current_note = st.session_state.notes.get(st.session_state.current_note)
             
             if current_note and current_note["content"]:
                 # Tools in expandable sections
                 with st.expander("Generate Summary", expanded=True):
                     if st.button("Create Summary", type="primary", use_container_width=True):
                         with st.spinner("Generating summary..."):
-                            summary = generate_summary(client, current_note["content"])
-                            st.markdown(summary)
+                            write_ai_stream(generate_summary_streaming(client, current_note["content"], on_partial=show_part_progress()))
                 
                 with st.expander("Topic-Specific Summary"):
                     topic = st.text_input("Enter specific topic:")
                     if topic and st.button("Generate Topic Summary", use_container_width=True):
                         with st.spinner(f"Generating summary for '{topic}'..."):
-                            topic_summary = generate_summary(client, current_note["content"], topic)
-                            st.markdown(topic_summary)
+                            write_ai_stream(generate_summary_streaming(client, current_note["content"], topic, on_partial=show_part_progress()))
                 
                 with st.expander("Analyze Notes"):
                     if st.button("Analyze for Gaps & Improvements", use_container_width=True):
                         with st.spinner("Analyzing notes..."):
-                            analysis = analyze_notes(client, current_note["content"])
-                            st.markdown(analysis)
+                            write_ai_stream(analyze_notes_streaming(client, current_note["content"], on_partial=show_part_progress()))
                 
                 # New Text-to-Speech feature
                 with st.expander("Text to Speech"):
@@ -162,20 +229,20 @@ def display_notes_main(client):
                     if st.button("Generate Study Material", use_container_width=True):
                         with st.spinner(f"Creating {material_type}..."):
                             if material_type == "Flashcards":
-                                content = generate_flashcards(client, current_note["content"], topic_for_material)
-                                st.markdown(content)
+                                content = generate_flashcards(client, current_note["content"], topic_for_material, on_partial=show_part_progress(), stream=True)
+                                write_ai_stream(content)
                             elif material_type == "Quiz Questions":
                                 # Quiz questions are essentially the same as flashcards
-                                content = generate_flashcards(client, current_note["content"], topic_for_material)
-                                st.markdown(content)
+                                content = generate_flashcards(client, current_note["content"], topic_for_material, on_partial=show_part_progress(), stream=True)
+                                write_ai_stream(content)
                             elif material_type == "Mind Map":
-                                content = generate_mind_map(client, current_note["content"], topic_for_material)
-                                st.markdown(content)
+                                content = generate_mind_map(client, current_note["content"], topic_for_material, on_partial=show_part_progress(), stream=True)
+                                write_ai_stream(content)
                             elif material_type == "Study Guide":
-                                content = generate_study_guide(client, current_note["content"], topic_for_material)
-                                st.markdown(content)
+                                content = generate_study_guide(client, current_note["content"], topic_for_material, on_partial=show_part_progress(), stream=True)
+                                write_ai_stream(content)
                             elif material_type == "Diagram":
-                                content = generate_diagram(client, current_note["content"], topic_for_material)
-                                st.markdown(content)
+                                content = generate_diagram(client, current_note["content"], topic_for_material, on_partial=show_part_progress(), stream=True)
+                                write_ai_stream(content)
             else:
                 st.info("Add content to your note to use these tools.")
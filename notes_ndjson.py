@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+
+def iter_ndjson_lines(notes):
+    """Yield each note as one line of newline-delimited JSON"""
+    for note in notes:
+        yield json.dumps(dict(note), ensure_ascii=False) + "\n"
+
+def write_ndjson(notes, filename):
+    """
+    Stream notes to a newline-delimited JSON file one at a time, atomically
+    replacing any previous version. Returns the number of notes written.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.notes-', suffix='.tmp')
+    count = 0
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for line in iter_ndjson_lines(notes):
+                f.write(line)
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, filename)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return count
+
+def iter_ndjson(filename, progress=None, progress_every=1000):
+    """
+    Yield notes from a newline-delimited JSON file without loading the whole
+    file. If given, progress(notes_read, bytes_read, total_bytes) is called
+    every `progress_every` notes and once at the end.
+    """
+    total_bytes = os.path.getsize(filename)
+    bytes_read = 0
+    count = 0
+    with open(filename, 'rb') as f:
+        for line_number, line in enumerate(f, start=1):
+            bytes_read += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{filename}:{line_number}: invalid JSON: {e.msg}") from e
+            count += 1
+            if progress is not None and count % progress_every == 0:
+                progress(count, bytes_read, total_bytes)
+
+    if progress is not None:
+        progress(count, bytes_read, total_bytes)
+
+def is_json_array_file(filename):
+    """Return True if the file holds a single JSON array rather than NDJSON"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        while True:
+            char = f.read(1)
+            if not char:
+                return False
+            if not char.isspace():
+                return char == '['
+
+def iter_notes_file(filename, progress=None):
+    """Yield notes from either a legacy JSON array file or an NDJSON file"""
+    if is_json_array_file(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            notes = json.load(f)
+        yield from notes
+        if progress is not None:
+            size = os.path.getsize(filename)
+            progress(len(notes), size, size)
+    else:
+        yield from iter_ndjson(filename, progress)
@@ -0,0 +1,250 @@
+import sqlite3
+import threading
+from itertools import islice
+from notes_ndjson import iter_notes_file
+from note_record import content_hash
+
+class SQLiteNotesStore:
+    def __init__(self, db_path='notes.db'):
+        """
+        Initialize a SQLite-backed note store. The database runs in WAL mode
+        so a saved note costs a single row upsert instead of rewriting the
+        whole corpus, and readers are never blocked by the writer. An FTS5
+        trigram index, kept in sync by triggers, answers substring searches
+        from disk.
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        # Every commit is fsynced; the autosave writer batches edits so this stays cheap
+        self.conn.execute('PRAGMA synchronous=FULL')
+        self._create_notes_table()
+
+    def _create_notes_table(self):
+        """
+        Create the notes, metadata and full-text tables if they don't exist
+        """
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS notes (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_edited REAL NOT NULL,
+                    content_hash TEXT
+                )
+            ''')
+            # Databases created before content hashes were tracked get the column added
+            columns = {row["name"] for row in self.conn.execute('PRAGMA table_info(notes)')}
+            if 'content_hash' not in columns:
+                self.conn.execute('ALTER TABLE notes ADD COLUMN content_hash TEXT')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_notes_last_edited ON notes (last_edited)')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            self._create_fts_table()
+
+    def _create_fts_table(self):
+        """
+        Create the trigram full-text index over note titles and content. It
+        reads the text from the notes table rather than keeping a copy, and
+        triggers update it whenever a note row changes.
+        """
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts'"
+        ).fetchone()
+        if exists:
+            return
+        self.conn.execute('''
+            CREATE VIRTUAL TABLE notes_fts USING fts5(
+                title, content, content='notes', content_rowid='id', tokenize='trigram'
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TRIGGER notes_fts_insert AFTER INSERT ON notes BEGIN
+                INSERT INTO notes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+            END
+        ''')
+        self.conn.execute('''
+            CREATE TRIGGER notes_fts_delete AFTER DELETE ON notes BEGIN
+                INSERT INTO notes_fts (notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            END
+        ''')
+        self.conn.execute('''
+            CREATE TRIGGER notes_fts_update AFTER UPDATE OF title, content ON notes BEGIN
+                INSERT INTO notes_fts (notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+                INSERT INTO notes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+            END
+        ''')
+        # Index the notes already in databases created before the full-text table
+        self.conn.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+
+    def _row_to_note(self, row):
+        """Convert a database row into a note dictionary"""
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "content": row["content"],
+            "created": row["created"],
+            "last_edited": row["last_edited"]
+        }
+
+    def upsert_notes(self, notes):
+        """Insert or update several notes in a single transaction"""
+        rows = [
+            (note["id"], note["title"], note["content"], note["created"],
+             note["last_edited"], content_hash(note["content"]))
+            for note in notes
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany('''
+                INSERT INTO notes (id, title, content, created, last_edited, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    title = excluded.title,
+                    content = excluded.content,
+                    last_edited = excluded.last_edited,
+                    content_hash = excluded.content_hash
+            ''', rows)
+
+    def delete_note(self, note_id):
+        """Delete a note by its ID"""
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM notes WHERE id = ?', (note_id,))
+
+    def get_content(self, note_id):
+        """Retrieve just the content of a note, or None if it doesn't exist"""
+        with self.lock:
+            row = self.conn.execute('SELECT content FROM notes WHERE id = ?', (note_id,)).fetchone()
+        return row["content"] if row else None
+
+    def search_substring(self, query):
+        """Return the set of IDs of notes whose title or content contains query, ignoring case"""
+        with self.lock:
+            if len(query) >= 3:
+                # A quoted phrase matches its trigrams consecutively, i.e. as a substring
+                phrase = '"' + query.replace('"', '""') + '"'
+                rows = self.conn.execute('SELECT rowid FROM notes_fts WHERE notes_fts MATCH ?', (phrase,)).fetchall()
+            else:
+                # Too short for a trigram lookup, so scan the rows
+                query = query.lower()
+                rows = self.conn.execute(
+                    'SELECT id FROM notes WHERE instr(lower(title), ?) OR instr(lower(content), ?)', (query, query)
+                ).fetchall()
+        return {row[0] for row in rows}
+
+    def load_metadata(self):
+        """Load every note's metadata without its content, ordered by ID"""
+        with self.lock:
+            # Backfill hashes for rows written before the column existed
+            missing = self.conn.execute('SELECT id, content FROM notes WHERE content_hash IS NULL').fetchall()
+            if missing:
+                with self.conn:
+                    self.conn.executemany(
+                        'UPDATE notes SET content_hash = ? WHERE id = ?',
+                        [(content_hash(row["content"]), row["id"]) for row in missing]
+                    )
+            rows = self.conn.execute('''
+                SELECT id, title, created, last_edited, length(content) AS content_length, content_hash
+                FROM notes ORDER BY id
+            ''').fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_notes(self, batch_size=500):
+        """Yield every note ordered by ID, reading a batch of rows at a time"""
+        # A separate read connection lets WAL serve a consistent snapshot without holding the lock
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute('SELECT * FROM notes ORDER BY id')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_note(row)
+        finally:
+            conn.close()
+
+    def import_notes(self, notes, batch_size=500):
+        """Upsert notes from any iterable in fixed-size batches. Returns the number imported"""
+        notes = iter(notes)
+        count = 0
+        while True:
+            batch = list(islice(notes, batch_size))
+            if not batch:
+                return count
+            self.upsert_notes(batch)
+            count += len(batch)
+
+    def get_meta(self, key, default=None):
+        """Read a value from the metadata table"""
+        with self.lock:
+            row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key, value):
+        """Write a value to the metadata table"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO meta (key, value) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+                (key, str(value))
+            )
+
+    def _advance_next_id(self, minimum, step):
+        """
+        Move the stored ID counter to at least `minimum` and past every
+        existing note, then forward by `step`; returns its new value. Must
+        be called inside a transaction.
+        """
+        self.conn.execute('''
+            INSERT INTO meta (key, value)
+            VALUES ('next_id', MAX(?, (SELECT COALESCE(MAX(id) + 1, 0) FROM notes)) + ?)
+            ON CONFLICT(key) DO UPDATE SET value = MAX(
+                CAST(value AS INTEGER), ?, (SELECT COALESCE(MAX(id) + 1, 0) FROM notes)
+            ) + ?
+        ''', (minimum, step, minimum, step))
+        return int(self.conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()["value"])
+
+    def allocate_id(self, minimum=0):
+        """
+        Reserve and return the next unused note ID. The counter is advanced
+        in one write transaction, so every database instance (and process)
+        on this file gets distinct IDs.
+        """
+        with self.lock, self.conn:
+            return self._advance_next_id(minimum, 1) - 1
+
+    def reserve_ids(self, minimum):
+        """Make sure IDs below `minimum` are never allocated; the counter never moves backwards"""
+        with self.lock, self.conn:
+            return self._advance_next_id(minimum, 0)
+
+    def migrate_from_json(self, filename='notes_database.json'):
+        """
+        Import notes from the legacy JSON (or NDJSON) file once. Returns the
+        number of notes imported, or 0 if the migration already ran or there
+        is no file.
+        """
+        if self.get_meta('json_migrated'):
+            return 0
+
+        try:
+            count = self.import_notes(iter_notes_file(filename))
+        except FileNotFoundError:
+            count = 0
+
+        self.set_meta('json_migrated', filename)
+        return count
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
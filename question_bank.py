@@ -0,0 +1,208 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+import numpy as np
+from lru_cache import LRUCache
+from note_record import content_hash
+from question_dedup import DUPLICATE_THRESHOLD, normalize_question, question_features
+
+# MinHash signatures are MINHASH_BANDS bands of MINHASH_ROWS rows; questions
+# sharing any band are candidates, checked against DUPLICATE_THRESHOLD
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+MINHASH_PRIME = (1 << 31) - 1
+
+# LSH indexes kept in memory, one per (note, content, question type)
+INDEX_CACHE_SIZE = 64
+
+_permutations = np.random.default_rng(0x5EED).integers(
+    1, MINHASH_PRIME, size=(2, MINHASH_BANDS * MINHASH_ROWS), dtype=np.int64
+)
+
+def minhash_signature(text):
+    """Return the MinHash signature of a question's words and word pairs"""
+    features = question_features(text) or {""}
+    # crc32 is stable across processes, unlike the built-in hash()
+    hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.int64, count=len(features))
+    hashes %= MINHASH_PRIME
+    a, b = _permutations
+    return ((np.outer(hashes, a) + b) % MINHASH_PRIME).min(axis=0)
+
+def estimated_similarity(a, b):
+    """Estimate the Jaccard similarity of two questions from their signatures"""
+    return float(np.mean(a == b))
+
+class MinHashLSH:
+    def __init__(self):
+        """
+        Initialize a locality-sensitive hash index of MinHash signatures,
+        so near-duplicates are found without comparing against every
+        stored question.
+        """
+        self.signatures = {}  # id -> signature
+        self.buckets = {}  # (band, band bytes) -> set of ids
+
+    def _bands(self, signature):
+        for band in range(MINHASH_BANDS):
+            rows = signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+            yield band, rows.tobytes()
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        for band in self._bands(signature):
+            self.buckets.setdefault(band, set()).add(key)
+
+    def find_duplicate(self, signature, threshold=DUPLICATE_THRESHOLD):
+        """Return the id of a stored signature at least `threshold` similar, or None"""
+        candidates = set()
+        for band in self._bands(signature):
+            candidates |= self.buckets.get(band, set())
+        for key in candidates:
+            if estimated_similarity(signature, self.signatures[key]) >= threshold:
+                return key
+        return None
+
+class QuestionBank:
+    def __init__(self, db_path='question_bank.db'):
+        """
+        Initialize a persistent bank of generated exam questions, keyed by
+        the ID of the note they were generated from, the hash of its
+        content and the question type, so an unchanged note can be examined
+        again without asking the AI. Near-duplicate questions are detected
+        with MinHash LSH and stored only once.
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self._create_tables()
+        # LSH indexes are built per (note ID, content hash, exam type) when first needed
+        self.indexes = LRUCache(INDEX_CACHE_SIZE)
+
+    def _create_tables(self):
+        """
+        Create the questions and counters tables if they don't exist
+        """
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS questions (
+                    id INTEGER PRIMARY KEY,
+                    source_note_id INTEGER,
+                    content_hash TEXT NOT NULL,
+                    exam_type TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    times_used INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL
+                )
+            ''')
+            # Banks created before questions were keyed by note get the column added
+            columns = {row["name"] for row in self.conn.execute('PRAGMA table_info(questions)')}
+            if 'source_note_id' not in columns:
+                self.conn.execute('ALTER TABLE questions ADD COLUMN source_note_id INTEGER')
+            self.conn.execute('DROP INDEX IF EXISTS idx_questions_content')
+            self.conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_questions_note ON questions (source_note_id, content_hash, exam_type, times_used)'
+            )
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS counters (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            ''')
+
+    def _index(self, key):
+        """Return the LSH index for a (note ID, content hash, exam type) key, loading it on first use"""
+        index = self.indexes.get(key)
+        if index is None:
+            index = MinHashLSH()
+            rows = self.conn.execute(
+                'SELECT id, signature FROM questions WHERE source_note_id IS ? AND content_hash = ? AND exam_type = ?', key
+            ).fetchall()
+            for row in rows:
+                index.add(row["id"], np.frombuffer(row["signature"], dtype=np.int64))
+            self.indexes.put(key, index)
+        return index
+
+    def _count(self, **increments):
+        """Add to the persistent counters; must be called inside a transaction"""
+        self.conn.executemany(
+            'INSERT INTO counters (key, value) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = value + excluded.value',
+            list(increments.items())
+        )
+
+    def take_questions(self, source_note_id, notes_content, exam_type, limit):
+        """
+        Return up to `limit` stored questions for this note, its current
+        content and the question type, least used first. The caller asks
+        the AI for the rest and reports what the exam used with record_lookup.
+        """
+        with self.lock, self.conn:
+            rows = self.conn.execute('''
+                SELECT id, question FROM questions
+                WHERE source_note_id IS ? AND content_hash = ? AND exam_type = ?
+                ORDER BY times_used, id
+                LIMIT ?
+            ''', (source_note_id, content_hash(notes_content), exam_type, limit)).fetchall()
+            self.conn.executemany(
+                'UPDATE questions SET times_used = times_used + 1 WHERE id = ?',
+                [(row["id"],) for row in rows]
+            )
+        return [json.loads(row["question"]) for row in rows]
+
+    def record_lookup(self, requested, hits):
+        """Record for the hit rate that an exam needed `requested` questions and the bank served `hits`"""
+        with self.lock, self.conn:
+            self._count(requested=requested, hits=hits)
+
+    def add_questions(self, source_note_id, notes_content, exam_type, questions):
+        """
+        Store newly generated questions, skipping any that near-duplicate a
+        question already banked for the same note content. Returns the
+        number stored.
+        """
+        key = (source_note_id, content_hash(notes_content), exam_type)
+        now = time.time()
+        stored = 0
+        with self.lock, self.conn:
+            index = self._index(key)
+            for question in questions:
+                text = question.get("question", "")
+                if not normalize_question(text):
+                    continue
+                signature = minhash_signature(text)
+                if index.find_duplicate(signature) is not None:
+                    continue
+                cursor = self.conn.execute('''
+                    INSERT INTO questions (source_note_id, content_hash, exam_type, question, signature, times_used, created)
+                    VALUES (?, ?, ?, ?, ?, 1, ?)
+                ''', (source_note_id, key[1], exam_type, json.dumps(question), signature.tobytes(), now))
+                index.add(cursor.lastrowid, signature)
+                stored += 1
+            self._count(generated=len(questions), stored=stored)
+        return stored
+
+    def get_stats(self):
+        """Return the bank size and how many requested questions it served"""
+        with self.lock:
+            counters = {row["key"]: row["value"] for row in self.conn.execute('SELECT key, value FROM counters')}
+            size = self.conn.execute('SELECT COUNT(*) FROM questions').fetchone()[0]
+        requested = counters.get("requested", 0)
+        hits = counters.get("hits", 0)
+        return {
+            "questions": size,
+            "requested": requested,
+            "hits": hits,
+            "generated": counters.get("generated", 0),
+            "stored": counters.get("stored", 0),
+            "hit_rate": hits / requested if requested else 0.0
+        }
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
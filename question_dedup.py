@@ -0,0 +1,52 @@
+import re
+
+# Questions this similar (Jaccard over words and word pairs) count as duplicates
+DUPLICATE_THRESHOLD = 0.75
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def normalize_question(text):
+    """Lowercase a question and reduce it to its words, dropping punctuation and numbering"""
+    words = WORD_PATTERN.findall(text.lower())
+    # Generated questions are often numbered ("Question 3: ...", "3. ...")
+    if words and words[0] == "question":
+        words = words[1:]
+    if words and words[0].isdigit():
+        words = words[1:]
+    return " ".join(words)
+
+def question_features(text):
+    """Return the set of words and adjacent word pairs of a normalized question"""
+    words = normalize_question(text).split()
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+def similarity(a, b):
+    """Jaccard similarity of two feature sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class QuestionDeduper:
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        """
+        Initialize a set of accepted questions that rejects questions whose
+        normalized text is too similar to one already accepted.
+        """
+        self.threshold = threshold
+        self.questions = []
+        self.features = []
+
+    def __len__(self):
+        return len(self.questions)
+
+    def add(self, question):
+        """Accept a question dict unless it duplicates one already accepted; returns whether it was added"""
+        text = question.get("question", "")
+        if not text.strip():
+            return False
+        features = question_features(text)
+        if any(similarity(features, seen) >= self.threshold for seen in self.features):
+            return False
+        self.questions.append(question)
+        self.features.append(features)
+        return True
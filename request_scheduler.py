@@ -0,0 +1,291 @@
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+import groq
+
+# Lower numbers are admitted first when the rate limits are binding
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+class AIError:
+    # Failures worth retrying, and the ones that mean the service itself is unhealthy
+    RETRYABLE = {"rate_limited", "timeout", "connection", "server"}
+    SERVICE_FAILURES = {"timeout", "connection", "server"}
+
+    def __init__(self, kind, message, status_code=None, retry_after=None):
+        """
+        Initialize a typed result for a failed AI request. Functions that
+        return AI text return an AIError instead of raising, so callers can
+        tell failures apart from responses with isinstance().
+        """
+        self.kind = kind
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.kind in self.RETRYABLE
+
+    def __str__(self):
+        return f"Error getting AI response: {self.message}"
+
+    def __repr__(self):
+        return f"AIError({self.kind!r}, {self.message!r})"
+
+def _retry_after(error):
+    """Return the Retry-After delay in seconds from an API error, if it has one"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def classify_error(error):
+    """Turn an exception from the Groq client into an AIError"""
+    if isinstance(error, groq.RateLimitError):
+        return AIError("rate_limited", "The AI service is busy; please try again shortly.",
+                       429, _retry_after(error))
+    if isinstance(error, groq.APITimeoutError):
+        return AIError("timeout", "The AI service took too long to respond.")
+    if isinstance(error, groq.APIConnectionError):
+        return AIError("connection", "Could not connect to the AI service.")
+    if isinstance(error, groq.APIStatusError):
+        status = error.status_code
+        if status >= 500 or status == 498:  # 498: Groq capacity exceeded
+            return AIError("server", f"The AI service had a problem ({status}).", status, _retry_after(error))
+        if status in (401, 403):
+            return AIError("auth", "The AI service rejected the API key.", status)
+        if status == 413:
+            return AIError("too_large", "The request was too large for the AI model.", status)
+        return AIError("bad_request", str(error), status)
+    return AIError("unexpected", str(error))
+
+class TokenBucket:
+    def __init__(self, per_minute, capacity=None):
+        """
+        Initialize a bucket that refills at `per_minute` units per minute up
+        to `capacity` (a minute's worth by default). A falsy rate means no
+        limit. Not thread-safe; the scheduler guards it with its own lock.
+        """
+        self.rate = per_minute / 60.0 if per_minute else 0.0
+        self.capacity = capacity or per_minute or 0
+        self.level = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Return how many seconds until `amount` units are available"""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        # Requests bigger than the bucket wait for a full bucket rather than forever
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        """Consume units; call only once wait_time(amount) is zero"""
+        if self.rate:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount):
+        """Return units that were reserved but not used"""
+        if self.rate and amount > 0:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """
+        Initialize a circuit breaker. After `failure_threshold` consecutive
+        service failures the circuit opens and requests fail fast; after
+        `reset_timeout` seconds one probe request is let through, and its
+        outcome closes or reopens the circuit.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a request may be sent now"""
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def retry_after(self):
+        """Return the seconds until the open circuit lets a probe through"""
+        with self.lock:
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+class RequestScheduler:
+    def __init__(self, requests_per_minute=30, tokens_per_minute=60000, max_retries=3,
+                 base_delay=1.0, max_delay=30.0, breaker=None):
+        """
+        Initialize a scheduler for AI requests. Requests are admitted in
+        priority order, each waiting for its share of the per-minute request
+        and token budgets; failures are retried with jittered exponential
+        backoff, and a circuit breaker fails fast while the service is down.
+        Blocking and asyncio callers share the same queue and budgets.
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.queue = []  # heap of (priority, sequence) tickets waiting for admission
+        self.sequence = itertools.count()
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+        self.stats = {"admitted": 0, "retries": 0, "failures": 0, "rate_limited": 0, "rejected": 0}
+
+    def acquire(self, tokens, priority=PRIORITY_INTERACTIVE):
+        """Block until a request of `tokens` tokens is admitted"""
+        ticket = (priority, next(self.sequence))
+        with self.condition:
+            heapq.heappush(self.queue, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self.queue[0] == ticket:
+                        wait = max(
+                            self.requests.wait_time(1),
+                            self.tokens.wait_time(tokens),
+                            self.paused_until - time.monotonic()
+                        )
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            self.stats["admitted"] += 1
+                            return
+                    self.condition.wait(wait)
+            finally:
+                self.queue.remove(ticket)
+                heapq.heapify(self.queue)
+                self.condition.notify_all()
+
+    def refund(self, tokens):
+        """Give back reserved tokens that the request didn't use"""
+        with self.condition:
+            self.tokens.give_back(tokens)
+            self.condition.notify_all()
+
+    def pause(self, seconds):
+        """Hold every request for `seconds`, e.g. after the service reports a rate limit"""
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def _backoff(self, attempt, retry_after=None):
+        """Return the delay before a retry: the server's hint, or exponential with full jitter"""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _before_attempt(self):
+        """Return an AIError if the circuit is open, else None"""
+        if self.breaker.allow():
+            return None
+        with self.condition:
+            self.stats["rejected"] += 1
+        return AIError("circuit_open", "The AI service is temporarily unavailable; please try again shortly.",
+                       retry_after=self.breaker.retry_after())
+
+    def _after_failure(self, error, attempt):
+        """Record a failed attempt; return the delay before retrying, or None to give up"""
+        with self.condition:
+            self.stats["failures"] += 1
+            if error.kind == "rate_limited":
+                self.stats["rate_limited"] += 1
+        if error.kind in AIError.SERVICE_FAILURES:
+            self.breaker.record_failure()
+        else:
+            # The service answered, so it is up even though this request failed
+            self.breaker.record_success()
+
+        if not error.retryable or attempt >= self.max_retries:
+            return None
+        delay = self._backoff(attempt, error.retry_after)
+        if error.kind == "rate_limited":
+            self.pause(delay)
+        with self.condition:
+            self.stats["retries"] += 1
+        return delay
+
+    def call(self, fn, tokens=0, priority=PRIORITY_INTERACTIVE):
+        """Run fn() under the limits with retries; returns its result or an AIError"""
+        attempt = 0
+        while True:
+            error = self._before_attempt()
+            if error is not None:
+                return error
+            self.acquire(tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                error = classify_error(e)
+                delay = self._after_failure(error, attempt)
+                if delay is None:
+                    return error
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def call_async(self, coroutine_fn, tokens=0, priority=PRIORITY_INTERACTIVE):
+        """Async version of call(); waiting for admission doesn't block the event loop"""
+        attempt = 0
+        while True:
+            error = self._before_attempt()
+            if error is not None:
+                return error
+            await asyncio.to_thread(self.acquire, tokens, priority)
+            try:
+                result = await coroutine_fn()
+            except Exception as e:
+                error = classify_error(e)
+                delay = self._after_failure(error, attempt)
+                if delay is None:
+                    return error
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    def get_stats(self):
+        """Return admission and failure counters and the circuit state"""
+        with self.condition:
+            stats = dict(self.stats)
+            stats["queued"] = len(self.queue)
+        stats["circuit"] = self.breaker.state
+        return stats
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def make_cache_key(**params):
+    """Return a stable hash of the request parameters that determine a response"""
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResponseCache:
+    def __init__(self, max_entries=256, max_bytes=8 * 1024 * 1024, ttl=3600,
+                 disk_path=None, max_disk_bytes=64 * 1024 * 1024):
+        """
+        Initialize a two-tier cache for AI responses. The in-memory tier is
+        an LRU bounded by entry count and total size; the optional on-disk
+        tier is a SQLite file bounded by size. Entries in both tiers expire
+        after `ttl` seconds.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()  # key -> (value, expires_at, size)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self.disk = None
+        if disk_path:
+            directory = os.path.dirname(os.path.abspath(disk_path))
+            os.makedirs(directory, exist_ok=True)
+            self.disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self.disk.execute('PRAGMA journal_mode=WAL')
+            self._create_cache_table()
+
+    def _create_cache_table(self):
+        """
+        Create the on-disk cache table if it doesn't exist
+        """
+        with self.disk:
+            self.disk.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            self.disk.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)')
+
+    def get(self, key):
+        """Return the cached response for key, or None on a miss"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
+                if expires_at > now:
+                    self.entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return value
+                self._remove(key)
+
+            if self.disk is not None:
+                row = self.disk.execute(
+                    'SELECT value, expires_at FROM responses WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    with self.disk:
+                        self.disk.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+                    self._store_in_memory(key, row[0], row[1])
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return row[0]
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, value, ttl=None):
+        """Cache a response in every tier"""
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        with self.lock:
+            self._store_in_memory(key, value, expires_at)
+            if self.disk is not None:
+                self._store_on_disk(key, value, expires_at)
+
+    def _remove(self, key):
+        """Drop an in-memory entry; caller must hold the lock"""
+        _, _, size = self.entries.pop(key)
+        self.total_bytes -= size
+
+    def _store_in_memory(self, key, value, expires_at):
+        """Insert into the LRU tier and evict until it fits; caller must hold the lock"""
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (value, expires_at, size)
+        self.total_bytes += size
+        while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def _store_on_disk(self, key, value, expires_at):
+        """Insert into the SQLite tier and evict least recently used rows over the size limit"""
+        now = time.time()
+        with self.disk:
+            self.disk.execute('''
+                INSERT INTO responses (key, value, expires_at, size, last_access)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    expires_at = excluded.expires_at,
+                    size = excluded.size,
+                    last_access = excluded.last_access
+            ''', (key, value, expires_at, len(value.encode()), now))
+            self.disk.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+
+            total = self.disk.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total > self.max_disk_bytes:
+                rows = self.disk.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall()
+                stale = []
+                for stale_key, size in rows:
+                    if total <= self.max_disk_bytes:
+                        break
+                    stale.append((stale_key,))
+                    total -= size
+                self.disk.executemany('DELETE FROM responses WHERE key = ?', stale)
+                self.stats["evictions"] += len(stale)
+
+    def clear(self):
+        """Remove every entry from both tiers"""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+            if self.disk is not None:
+                with self.disk:
+                    self.disk.execute('DELETE FROM responses')
+
+    def get_stats(self):
+        """Return hit/miss counters and current memory-tier usage"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+            stats["bytes"] = self.total_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,254 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def make_snippet(text, query, width=120):
+    """Return a short excerpt of text around the first query match, with matches in bold"""
+    terms = sorted(set(tokenize(query)), key=len, reverse=True)
+    if not text or not terms:
+        return text[:width]
+
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    match = pattern.search(text)
+    if match is None:
+        excerpt = text[:width]
+        return excerpt + ("..." if len(text) > width else "")
+
+    # Center the excerpt on the first match
+    start = max(0, match.start() - width // 3)
+    end = min(len(text), start + width)
+    excerpt = " ".join(text[start:end].split())
+    excerpt = pattern.sub(lambda m: f"**{m.group(0)}**", excerpt)
+
+    prefix = "..." if start > 0 else ""
+    suffix = "..." if end < len(text) else ""
+    return prefix + excerpt + suffix
+
+def trigrams(text):
+    """Return the set of character trigrams in an already lowercased string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TrigramIndex:
+    def __init__(self, load_note):
+        """
+        Initialize a character trigram index over note titles and content.
+        Substring queries intersect the postings of their trigrams to find
+        candidate notes, then verify the candidates with a real substring
+        check against the note returned by load_note(note_id). Notes' own
+        trigram sets aren't kept; callers pass the previous version of a
+        note when it changes, and a stale posting only costs a candidate
+        that fails verification.
+        """
+        self.load_note = load_note
+        self.postings = defaultdict(set)  # trigram -> {note_id}
+        self.note_ids = set()
+
+    def _note_trigrams(self, note):
+        """Return the trigrams of a note's lowercased title and content"""
+        return trigrams(note.get("title", "").lower()) | trigrams(note.get("content", "").lower())
+
+    def _discard(self, note_id, grams):
+        for gram in grams:
+            postings = self.postings.get(gram)
+            if postings is None:
+                continue
+            postings.discard(note_id)
+            if not postings:
+                del self.postings[gram]
+
+    def add_note(self, note, previous=None):
+        """
+        Index a note. If `previous` (its last indexed title and content) is
+        given, only the trigrams that changed since then are touched.
+        """
+        note_id = note["id"]
+        new_trigrams = self._note_trigrams(note)
+        old_trigrams = self._note_trigrams(previous) if previous is not None else set()
+
+        self._discard(note_id, old_trigrams - new_trigrams)
+        for gram in new_trigrams - old_trigrams:
+            self.postings[gram].add(note_id)
+        self.note_ids.add(note_id)
+
+    def remove_note(self, note_id, previous=None):
+        """Remove a note, given its last indexed version, from the index if present"""
+        self.note_ids.discard(note_id)
+        if previous is not None:
+            self._discard(note_id, self._note_trigrams(previous))
+
+    def candidates(self, query):
+        """Return the IDs of notes that contain every trigram of the query"""
+        query_trigrams = trigrams(query.lower())
+        if not query_trigrams:
+            # Queries shorter than three characters cannot be narrowed down
+            return set(self.note_ids)
+
+        # Intersect the rarest postings first so the working set stays small
+        postings = sorted((self.postings.get(gram, set()) for gram in query_trigrams), key=len)
+        result = postings[0] & self.note_ids
+        for posting in postings[1:]:
+            if not result:
+                break
+            result &= posting
+        return result
+
+    def search(self, query):
+        """Return the set of note IDs whose title or content contains the query"""
+        query = query.lower()
+        matches = set()
+        for note_id in self.candidates(query):
+            note = self.load_note(note_id)
+            if query in note["title"].lower() or query in note["content"].lower():
+                matches.add(note_id)
+        return matches
+
+class StoreSubstringIndex:
+    def __init__(self, store, load_note):
+        """
+        Initialize a substring index backed by the store's full-text table,
+        which the store keeps up to date as notes are committed, so nothing
+        but the IDs of unsaved notes is held in memory. Notes marked with
+        changed(note_id) are matched against load_note(note_id) instead,
+        until committed(note_id) reports them saved.
+        """
+        self.store = store
+        self.load_note = load_note
+        self.lock = threading.Lock()
+        self.pending = set()  # IDs of notes changed since their last commit
+
+    def add_note(self, note, previous=None):
+        """Committed notes are indexed by the store itself"""
+
+    def remove_note(self, note_id, previous=None):
+        """Forget a note; the store drops it from the full-text table when it is deleted"""
+        self.committed(note_id)
+
+    def changed(self, note_id):
+        """Match a note in memory until its latest version is committed"""
+        with self.lock:
+            self.pending.add(note_id)
+
+    def committed(self, note_id):
+        """Report that the latest version of a note has been written to the store"""
+        with self.lock:
+            self.pending.discard(note_id)
+
+    def search(self, query):
+        """Return the set of note IDs whose title or content contains the query"""
+        with self.lock:
+            pending = set(self.pending)
+        matches = self.store.search_substring(query) - pending
+        query = query.lower()
+        for note_id in pending:
+            note = self.load_note(note_id)
+            if note is not None and (query in note["title"].lower() or query in note["content"].lower()):
+                matches.add(note_id)
+        return matches
+
+class NoteSearchIndex:
+    def __init__(self, load_note, k1=1.5, b=0.75, title_boost=2, substring_index=None):
+        """
+        Initialize an inverted index over note titles and content,
+        ranked with BM25. Notes are indexed incrementally so a search
+        only touches the postings of the query terms. A substring index
+        alongside it keeps the "substring anywhere" matching behaviour:
+        a trigram index fetching notes through load_note(note_id) to
+        verify matches, unless another one is given.
+        """
+        self.k1 = k1
+        self.b = b
+        self.title_boost = title_boost
+        self.postings = defaultdict(dict)  # term -> {note_id: term frequency}
+        self.doc_terms = {}  # note_id -> Counter of terms, used for removal
+        self.doc_lengths = {}
+        self.total_length = 0
+        self.substring_index = substring_index or TrigramIndex(load_note)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add_note(self, note, previous=None):
+        """
+        Index a note, replacing any previous version with the same ID.
+        `previous` is that version's title and content, if known.
+        """
+        note_id = note["id"]
+        self._remove_terms(note_id)
+
+        # Title terms are counted several times so title matches rank higher
+        terms = Counter(tokenize(note.get("content", "")))
+        for term in tokenize(note.get("title", "")):
+            terms[term] += self.title_boost
+
+        for term, frequency in terms.items():
+            self.postings[term][note_id] = frequency
+
+        length = sum(terms.values())
+        self.doc_terms[note_id] = terms
+        self.doc_lengths[note_id] = length
+        self.total_length += length
+        self.substring_index.add_note(note, previous)
+
+    def remove_note(self, note_id, previous=None):
+        """Remove a note, given its last indexed version, from the index if present"""
+        self.substring_index.remove_note(note_id, previous)
+        self._remove_terms(note_id)
+
+    def _remove_terms(self, note_id):
+        """Drop a note's word postings"""
+        terms = self.doc_terms.pop(note_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self.postings[term]
+            postings.pop(note_id, None)
+            if not postings:
+                del self.postings[term]
+
+        self.total_length -= self.doc_lengths.pop(note_id)
+
+    def score(self, query):
+        """Return a dict of note_id -> BM25 score for every note matching the query"""
+        scores = defaultdict(float)
+        if not self.doc_lengths:
+            return scores
+
+        num_docs = len(self.doc_lengths)
+        avg_length = self.total_length / num_docs or 1
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for note_id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[note_id] / avg_length)
+                scores[note_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        return scores
+
+    def search(self, query, limit=None):
+        """
+        Return a list of (note_id, score) tuples, best match first.
+        Notes containing the query as a substring come first, followed by
+        notes that only match some of the query's words.
+        """
+        scores = self.score(query)
+        substring_matches = self.substring_index.search(query)
+        for note_id in substring_matches:
+            scores.setdefault(note_id, 0.0)
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (item[0] not in substring_matches, -item[1], item[0])
+        )
+        return ranked[:limit] if limit is not None else ranked
@@ -0,0 +1,127 @@
+import zlib
+from collections import Counter
+from functools import lru_cache
+import numpy as np
+from search_index import tokenize
+
+@lru_cache(maxsize=65536)
+def char_ngrams(word):
+    """Return the character 3- and 4-grams of a word, with boundary markers"""
+    padded = f"<{word}>"
+    return tuple(
+        "#" + padded[j:j + n]
+        for n in (3, 4)
+        for j in range(len(padded) - n + 1)
+    )
+
+def hashed_features(text, dim):
+    """
+    Return (indices, signs, weights) for the hashed features of a text:
+    words, word bigrams and character n-grams inside each word, so that
+    related word forms ("cluster", "clustering") share features
+    """
+    words = tokenize(text)
+    word_counts = Counter(words)
+    features = Counter({word: float(count) for word, count in word_counts.items()})
+    for bigram, count in Counter(zip(words, words[1:])).items():
+        features[" ".join(bigram)] += 0.5 * count
+    # Character n-grams are computed once per distinct word
+    for word, count in word_counts.items():
+        for gram in char_ngrams(word):
+            features[gram] += 0.25 * count
+
+    # crc32 is stable across processes, unlike the built-in hash()
+    hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.int64, count=len(features))
+    counts = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+    indices = hashes % dim
+    signs = np.where((hashes >> 31) & 1, 1.0, -1.0).astype(np.float32)
+    weights = 1.0 + np.log1p(counts)  # sublinear term frequency
+    return indices, signs, weights
+
+class SemanticIndex:
+    def __init__(self, dim=1024, min_score=0.05):
+        """
+        Initialize an offline vector index over notes. Each note becomes a
+        row of hashed n-gram counts in a float32 matrix; queries are
+        weighted by inverse document frequency and scored against every
+        row at once with a matrix product (cosine similarity). Rows are
+        updated in place as notes change, and nothing needs a network or GPU.
+        """
+        self.dim = dim
+        self.min_score = min_score
+        self.matrix = np.zeros((64, dim), dtype=np.float32)
+        self.doc_freq = np.zeros(dim, dtype=np.float32)
+        self.row_of = {}  # note_id -> row in the matrix
+        self.ids = []  # row -> note_id
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _vectorize(self, text):
+        """Return the hashed feature vector of a text"""
+        indices, signs, weights = hashed_features(text, self.dim)
+        return np.bincount(indices, signs * weights, minlength=self.dim).astype(np.float32)
+
+    def add_note(self, note):
+        """Index a note, replacing its previous vector if it was already indexed"""
+        vector = self._vectorize(f"{note.get('title', '')}\n{note.get('content', '')}")
+        row = self.row_of.get(note["id"])
+        if row is None:
+            row = len(self.ids)
+            if row == len(self.matrix):
+                # Grow geometrically so appends stay amortized constant time
+                self.matrix = np.vstack([self.matrix, np.zeros_like(self.matrix)])
+            self.row_of[note["id"]] = row
+            self.ids.append(note["id"])
+        else:
+            self.doc_freq -= self.matrix[row] != 0
+
+        self.matrix[row] = vector
+        self.doc_freq += vector != 0
+
+    def remove_note(self, note_id):
+        """Remove a note, moving the last row into its place"""
+        row = self.row_of.pop(note_id, None)
+        if row is None:
+            return
+        self.doc_freq -= self.matrix[row] != 0
+
+        last = len(self.ids) - 1
+        if row != last:
+            self.matrix[row] = self.matrix[last]
+            self.ids[row] = self.ids[last]
+            self.row_of[self.ids[row]] = row
+        self.matrix[last] = 0
+        self.ids.pop()
+
+    def search_batch(self, queries, limit=10):
+        """Score several queries at once; returns a list of [(note_id, score)] per query"""
+        if not self.ids or not queries:
+            return [[] for _ in queries]
+
+        count = len(self.ids)
+        idf = np.log((1 + count) / (1 + self.doc_freq)).astype(np.float32) + 1.0
+        docs = self.matrix[:count] * idf
+        doc_norms = np.linalg.norm(docs, axis=1)
+        doc_norms[doc_norms == 0] = 1.0
+
+        query_matrix = np.stack([self._vectorize(query) for query in queries]) * idf
+        query_norms = np.linalg.norm(query_matrix, axis=1)
+        query_norms[query_norms == 0] = 1.0
+
+        scores = (query_matrix @ docs.T) / np.outer(query_norms, doc_norms)
+
+        results = []
+        for row_scores in scores:
+            top = min(limit, count)
+            best = np.argpartition(-row_scores, top - 1)[:top]
+            best = best[np.argsort(-row_scores[best])]
+            results.append([
+                (self.ids[i], float(row_scores[i]))
+                for i in best if row_scores[i] >= self.min_score
+            ])
+        return results
+
+    def search(self, query, limit=10):
+        """Return a list of (note_id, similarity) tuples, most similar first"""
+        return self.search_batch([query], limit)[0]
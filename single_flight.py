@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class SharedStream:
+    def __init__(self):
+        """
+        Initialize a stream of chunks that any number of readers can follow.
+        Readers that join late replay the chunks produced so far and then
+        wait for the rest.
+        """
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def append(self, chunk):
+        """Publish a chunk to every reader"""
+        with self.condition:
+            self.chunks.append(chunk)
+            self.condition.notify_all()
+
+    def close(self, error=None):
+        """Mark the stream finished, optionally with an error to raise in readers"""
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+    def __iter__(self):
+        index = 0
+        while True:
+            with self.condition:
+                while index >= len(self.chunks) and not self.done:
+                    self.condition.wait()
+                if index < len(self.chunks):
+                    chunk = self.chunks[index]
+                    index += 1
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            yield chunk
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Initialize a process-wide single-flight group. Concurrent calls with
+        the same key share one execution: the first caller runs it and every
+        caller that arrives while it is in flight receives the same result.
+        Works across threads and event loops, so separate sessions coalesce.
+        """
+        self.calls = {}  # key -> Future of the in-flight call
+        self.streams = {}  # key -> SharedStream of the in-flight stream
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "deduplicated": 0, "stream_calls": 0, "stream_deduplicated": 0}
+
+    def _join(self, table, key, factory, stat):
+        """Return (call, is_leader) for key, registering a new call if none is in flight"""
+        with self.lock:
+            call = table.get(key)
+            if call is not None:
+                self.stats[f"{stat}deduplicated"] += 1
+                return call, False
+            call = factory()
+            table[key] = call
+            self.stats[f"{stat}calls"] += 1
+            return call, True
+
+    def _finish(self, table, key, call):
+        """Stop sharing a finished call so later requests start a new one"""
+        with self.lock:
+            if table.get(key) is call:
+                del table[key]
+
+    def do(self, key, fn):
+        """Return fn(), sharing the result with concurrent callers using the same key"""
+        future, leader = self._join(self.calls, key, Future, "")
+        if leader:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._finish(self.calls, key, future)
+        return future.result()
+
+    async def do_async(self, key, coroutine_fn):
+        """Async version of do(); coroutine_fn returns the awaitable to share"""
+        future, leader = self._join(self.calls, key, Future, "")
+        if leader:
+            try:
+                future.set_result(await coroutine_fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._finish(self.calls, key, future)
+        return await asyncio.wrap_future(future)
+
+    def stream(self, key, make_iterator):
+        """
+        Yield the chunks of make_iterator(), sharing one upstream iteration
+        with concurrent callers using the same key. The upstream is drained
+        on a background thread, so a reader that stops early doesn't stall
+        the others.
+        """
+        shared, leader = self._join(self.streams, key, SharedStream, "stream_")
+        if leader:
+            def pump():
+                try:
+                    for chunk in make_iterator():
+                        shared.append(chunk)
+                    shared.close()
+                except BaseException as e:
+                    shared.close(e)
+                finally:
+                    self._finish(self.streams, key, shared)
+
+            threading.Thread(target=pump, name="single-flight-stream", daemon=True).start()
+        yield from shared
+
+    def get_stats(self):
+        """Return how many upstream calls were made and how many were deduplicated"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self.calls) + len(self.streams)
+        requests = stats["calls"] + stats["deduplicated"] + stats["stream_calls"] + stats["stream_deduplicated"]
+        deduplicated = stats["deduplicated"] + stats["stream_deduplicated"]
+        stats["dedup_rate"] = deduplicated / requests if requests else 0.0
+        return stats
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import deque
+from token_budget import estimate_tokens
+
+def percentile(values, fraction):
+    """Return the value at a fraction of the way through sorted values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class StreamMetrics:
+    def __init__(self, window=500):
+        """
+        Initialize a rolling record of streaming latency: time to first
+        token and generation speed for the last `window` streamed responses.
+        """
+        self.records = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def record(self, ttft, duration, tokens):
+        """Record one finished stream and return its metrics"""
+        generating = duration - ttft
+        metrics = {
+            "ttft": ttft,
+            "duration": duration,
+            "tokens": tokens,
+            "tokens_per_second": tokens / generating if generating > 0 else 0.0
+        }
+        with self.lock:
+            self.records.append(metrics)
+            self.count += 1
+        return metrics
+
+    def measure(self, chunks, on_metrics=None):
+        """
+        Yield chunks unchanged while timing them as the consumer sees them.
+        When the stream ends its metrics are recorded and passed to
+        on_metrics(metrics).
+        """
+        start = time.perf_counter()
+        first = None
+        text = []
+        for chunk in chunks:
+            if first is None:
+                first = time.perf_counter()
+            text.append(chunk)
+            yield chunk
+        end = time.perf_counter()
+
+        if first is None:
+            return
+        metrics = self.record(first - start, end - start, estimate_tokens("".join(text)))
+        if on_metrics is not None:
+            on_metrics(metrics)
+
+    def get_stats(self):
+        """Return percentiles of time to first token and tokens per second"""
+        with self.lock:
+            records = list(self.records)
+            count = self.count
+        ttfts = [r["ttft"] for r in records]
+        speeds = [r["tokens_per_second"] for r in records]
+        return {
+            "streams": count,
+            "ttft_p50": percentile(ttfts, 0.5),
+            "ttft_p95": percentile(ttfts, 0.95),
+            "tokens_per_second_p50": percentile(speeds, 0.5),
+            "last": records[-1] if records else None
+        }
@@ -1,8 +1,9 @@
 import os
 import streamlit as st
-from groq_client import get_ai_response
+from groq_client import map_reduce_ai_response, map_reduce_ai_response_streaming
+from request_scheduler import AIError
 
-def generate_flashcards(client, notes, topic=None):
+def generate_flashcards(client, notes, topic=None, on_partial=None, stream=False):
     """Generate flashcards from notes using the Groq API"""
     if topic:
         system_message = f"""You are a study assistant. Create 5-10 flashcards from the notes specifically about '{topic}'.
@@ -21,9 +22,11 @@ def generate_flashcards(client, notes, topic=None):
         Cover key concepts, definitions, and important relationships between ideas.
         Include a mix of factual recall and conceptual understanding questions."""
     
-    return get_ai_response(client, notes, system_message)
+    if stream:
+        return map_reduce_ai_response_streaming(client, notes, system_message, on_partial)
+    return map_reduce_ai_response(client, notes, system_message, on_partial)
 
-def generate_study_guide(client, notes, topic=None):
+def generate_study_guide(client, notes, topic=None, on_partial=None, stream=False):
     """Generate a study guide from notes using the Groq API"""
     if topic:
         system_message = f"""You are a study assistant. Create a focused study guide about '{topic}' based on the provided notes.
@@ -47,9 +50,11 @@ def generate_study_guide(client, notes, topic=None):
         
         Format the guide with clear headings and bullet points for easy review."""
     
-    return get_ai_response(client, notes, system_message)
+    if stream:
+        return map_reduce_ai_response_streaming(client, notes, system_message, on_partial)
+    return map_reduce_ai_response(client, notes, system_message, on_partial)
 
-def generate_mind_map(client, notes, topic=None):
+def generate_mind_map(client, notes, topic=None, on_partial=None, stream=False):
     """Generate a mind map description from notes using the Groq API"""
     if topic:
         system_message = f"""You are a study assistant. Create a text-based mind map about '{topic}' based on the provided notes.
@@ -84,9 +89,11 @@ def generate_mind_map(client, notes, topic=None):
         Focus on showing hierarchical relationships and connections between concepts.
         Include all major topics from the notes with their related subtopics and details."""
     
-    return get_ai_response(client, notes, system_message)
+    if stream:
+        return map_reduce_ai_response_streaming(client, notes, system_message, on_partial)
+    return map_reduce_ai_response(client, notes, system_message, on_partial)
 
-def generate_diagram(client, notes, topic=None):
+def generate_diagram(client, notes, topic=None, on_partial=None, stream=False):
     """Generate a diagram description or code from notes using the Groq API"""
     if topic:
         system_message = f"""You are a study assistant. Create a Mermaid diagram about '{topic}' based on the provided notes.
@@ -111,7 +118,12 @@ def generate_diagram(client, notes, topic=None):
         Choose the appropriate diagram type (flowchart, sequence, class, etc.) based on the content.
         Provide the diagram in Mermaid syntax, surrounded by triple backticks with mermaid language specification."""
     
-    response = get_ai_response(client, notes, system_message)
+    if stream:
+        # Streamed diagrams are shown as they arrive, without the wrapper below
+        return map_reduce_ai_response_streaming(client, notes, system_message, on_partial)
+    response = map_reduce_ai_response(client, notes, system_message, on_partial)
+    if isinstance(response, AIError):
+        return response
     
     # To properly render Mermaid diagrams in Streamlit, we need some additional processing
     # We'll wrap the response to ensure proper rendering
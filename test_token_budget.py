@@ -0,0 +1,30 @@
+from token_budget import ESTIMATE_MARGIN, TRIM_MARKER, context_limit, estimate_tokens, fit_prompt
+
+MODEL = "llama3-70b-8192"
+SYSTEM_MESSAGE = "You are an exam generator."
+
+def make_text(words):
+    return " ".join(f"concept{i % 97} relates to idea{i % 89}." for i in range(words))
+
+def test_untrimmed_prompt_keeps_requested_reply():
+    prompt = make_text(200)
+    fitted, max_tokens = fit_prompt(prompt, SYSTEM_MESSAGE, MODEL, max_tokens=1756)
+    assert fitted == prompt
+    assert max_tokens == 1756
+
+def test_trimmed_prompt_keeps_requested_reply():
+    # A ~7.9k token note asked for five exam questions
+    prompt = make_text(1600)
+    assert estimate_tokens(prompt) > 7900
+    fitted, max_tokens = fit_prompt(prompt, SYSTEM_MESSAGE, MODEL, max_tokens=1756)
+    assert TRIM_MARKER.strip() in fitted
+    assert max_tokens >= 1750
+    padded = (estimate_tokens(fitted) + estimate_tokens(SYSTEM_MESSAGE)) * ESTIMATE_MARGIN
+    assert padded + max_tokens <= context_limit(MODEL)
+
+def test_reply_reservation_is_capped_at_half_the_context():
+    prompt = make_text(1600)
+    fitted, max_tokens = fit_prompt(prompt, SYSTEM_MESSAGE, MODEL, max_tokens=8000)
+    # The prompt is only trimmed far enough to leave half the window for the reply
+    assert TRIM_MARKER.strip() in fitted
+    assert abs(max_tokens - context_limit(MODEL) // 2) <= 8
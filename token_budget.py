@@ -0,0 +1,109 @@
+import math
+import re
+from lru_cache import LRUCache
+from note_record import content_hash
+
+# Context window sizes in tokens; unknown models get the smallest common window
+MODEL_CONTEXT_LIMITS = {
+    "llama3-70b-8192": 8192,
+    "llama3-8b-8192": 8192,
+    "llama-3.3-70b-versatile": 131072,
+    "llama-3.1-8b-instant": 131072,
+    "mixtral-8x7b-32768": 32768,
+    "gemma2-9b-it": 8192,
+}
+DEFAULT_CONTEXT_LIMIT = 8192
+
+# Chat formatting tokens added around each message and before the reply
+MESSAGE_OVERHEAD = 4
+REPLY_OVERHEAD = 3
+
+# Roughly one token per short word or word piece, digit group, or symbol. BPE
+# tokenizers split long and technical words further, so this underestimates
+# technical English by up to about a fifth
+TOKEN_PATTERN = re.compile(r"[A-Za-z]{1,8}|\d{1,3}|\S")
+
+# Prompts are fitted as if they were this much longer than estimated, so a
+# prompt trimmed to the limit still fits once the real tokenizer counts it
+ESTIMATE_MARGIN = 1.25
+
+# The most of the context window a reply may reserve; the prompt gets the rest
+MAX_REPLY_FRACTION = 0.5
+
+TRIM_MARKER = "\n\n[... part of the text was omitted to fit the model's context ...]\n\n"
+
+# Token counts keyed by content hash, so unchanged notes are never recounted
+token_counts = LRUCache(4096)
+
+def estimate_tokens(text):
+    """Return a fast local estimate of the number of tokens in text"""
+    return len(TOKEN_PATTERN.findall(text))
+
+def count_tokens(text, key=None):
+    """Return the estimated token count of text, cached by its content hash"""
+    if key is None:
+        key = content_hash(text)
+    count = token_counts.get(key)
+    if count is None:
+        count = estimate_tokens(text)
+        token_counts.put(key, count)
+    return count
+
+def count_note_tokens(note):
+    """
+    Return the estimated token count of a note's content. Records that know
+    their content hash are answered from the cache without loading content.
+    """
+    key = getattr(note, "content_hash", None)
+    if key is not None:
+        count = token_counts.get(key)
+        if count is not None:
+            return count
+    return count_tokens(note["content"], key)
+
+def context_limit(model):
+    """Return the context window of a model in tokens"""
+    return MODEL_CONTEXT_LIMITS.get(model, DEFAULT_CONTEXT_LIMIT)
+
+def compress_prompt(text):
+    """Drop redundant whitespace, which costs tokens without carrying meaning"""
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+def trim_to_tokens(text, budget):
+    """Cut text to about budget tokens, keeping its beginning and end"""
+    starts = [match.start() for match in TOKEN_PATTERN.finditer(text)]
+    if len(starts) <= budget:
+        return text
+    budget -= estimate_tokens(TRIM_MARKER)
+    if budget <= 0:
+        return ""
+    head = budget * 2 // 3
+    tail = budget - head
+    trimmed = text[:starts[head]].rstrip() + TRIM_MARKER
+    if tail:
+        trimmed += text[starts[len(starts) - tail]:].lstrip()
+    return trimmed
+
+def padded_tokens(text):
+    """Return the estimated token count of text with ESTIMATE_MARGIN added"""
+    return math.ceil(count_tokens(text) * ESTIMATE_MARGIN)
+
+def fit_prompt(prompt, system_message, model, max_tokens=1024):
+    """
+    Fit a request into the model's context window. Returns (prompt,
+    max_tokens): the reply keeps the requested max_tokens, capped at
+    MAX_REPLY_FRACTION of the window, and a prompt that doesn't fit in
+    the rest is compressed and then trimmed to fit. Token counts are
+    padded by ESTIMATE_MARGIN.
+    """
+    limit = context_limit(model)
+    reply = min(max_tokens, int(limit * MAX_REPLY_FRACTION))
+    fixed = padded_tokens(system_message) + 2 * MESSAGE_OVERHEAD + REPLY_OVERHEAD
+    if limit - fixed - padded_tokens(prompt) < reply:
+        prompt = compress_prompt(prompt)
+        budget = int((limit - fixed - reply) / ESTIMATE_MARGIN)
+        prompt = trim_to_tokens(prompt, max(budget, 0))
+    available = limit - fixed - padded_tokens(prompt)
+    return prompt, max(1, min(max_tokens, available))
@@ -1,5 +1,7 @@
 import streamlit as st
 from datetime import datetime
+from groq_client import stream_metrics
+from request_scheduler import AIError
 
 def set_page_config():
     """Set the Streamlit page configuration"""
@@ -80,3 +82,57 @@ def format_last_edited(timestamp):
     """Format the last edited timestamp in a Google Docs style"""
     dt = datetime.fromtimestamp(timestamp)
     return f"Last edited {dt.strftime('%I:%M %p')}"
+
+def paginate(key, page, total, page_size, item_label=None):
+    """
+    Show ◀/▶ page controls when `total` items span more than one page.
+    The current page lives in st.session_state[key]; item_label (e.g.
+    "attempts") adds the item count to the page caption.
+    """
+    page_count = max(1, -(-total // page_size))
+    if page_count <= 1:
+        return
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("◀", key=f"{key}_prev", disabled=page == 0, use_container_width=True):
+            st.session_state[key] = page - 1
+            st.rerun()
+    with info_col:
+        caption = f"Page {page + 1} of {page_count}"
+        if item_label:
+            caption += f" ({total} {item_label})"
+        st.caption(caption)
+    with next_col:
+        if st.button("▶", key=f"{key}_next", disabled=page >= page_count - 1, use_container_width=True):
+            st.session_state[key] = page + 1
+            st.rerun()
+
+def show_ai_result(result, container=st):
+    """Show an AI response as markdown, or a failed request as an error"""
+    if isinstance(result, AIError):
+        container.error(str(result))
+    else:
+        container.markdown(result)
+
+def write_ai_stream(stream):
+    """
+    Render a streamed AI response as it arrives, then its latency. Returns
+    the full text, or the AIError if the request failed.
+    """
+    metrics = {}
+    failure = []
+    
+    def text_chunks():
+        for chunk in stream:
+            if isinstance(chunk, AIError):
+                failure.append(chunk)
+                return
+            yield chunk
+    
+    response = st.write_stream(stream_metrics.measure(text_chunks(), on_metrics=metrics.update))
+    if failure:
+        st.error(str(failure[0]))
+        return failure[0]
+    if metrics:
+        st.caption(f"First token in {metrics['ttft']:.2f}s · {metrics['tokens_per_second']:.0f} tokens/s")
+    return response
@@ -12,7 +12,8 @@ import os
 
 # Import Groq functionality
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from groq_client import initialize_groq, get_ai_response
+from groq_client import get_groq_client, get_ai_response, fan_out_ai_responses
+from ui_components import show_ai_result
 
 def preprocess_image(image_array):
     """Preprocess the image for better OCR results"""
@@ -70,14 +71,28 @@ def extract_math_from_image(image_array):
     
     return encoded
 
+def display_concurrent_sections(sections):
+    """
+    Render several AI-generated sections whose requests run concurrently.
+    Each section is a (heading, request) pair; headings render immediately
+    and each body fills in as soon as its own request finishes.
+    """
+    placeholders = []
+    for heading, _ in sections:
+        st.subheader(heading)
+        placeholder = st.empty()
+        placeholder.caption("Generating...")
+        placeholders.append(placeholder)
+    
+    fan_out_ai_responses(
+        [request for _, request in sections],
+        lambda index, response: show_ai_result(response, placeholders[index])
+    )
+
 def display_whiteboard():
     """Display the whiteboard tab with enhanced analysis functionality"""
     st.header("Interactive Whiteboard")
     
-    # Initialize Groq client if not already in session state
-    if 'groq_client' not in st.session_state:
-        st.session_state.groq_client = initialize_groq()
-    
     # Add controls for the whiteboard
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -158,15 +173,14 @@ def display_whiteboard():
                         
                         Please compensate for any OCR errors by inferring the most likely intended meaning."""
                         
-                        ai_analysis = get_ai_response(st.session_state.groq_client, extracted_text, system_message)
-                        st.subheader("Comprehensive Analysis")
-                        st.markdown(ai_analysis)
-                        
-                        # Add additional insights section
-                        st.subheader("Practical Applications")
                         practical_prompt = f"Based on these concepts from {subject_area}: {extracted_text}\n\nProvide 3-5 specific real-world applications or scenarios where these concepts are used in practice. Be specific and concrete."
-                        practical_insights = get_ai_response(st.session_state.groq_client, practical_prompt, "You are a practical application specialist.")
-                        st.markdown(practical_insights)
+                        
+                        # The analysis and the applications are independent, so request them together
+                        display_concurrent_sections([
+                            ("Comprehensive Analysis", {"prompt": extracted_text, "system_message": system_message}),
+                            # Add additional insights section
+                            ("Practical Applications", {"prompt": practical_prompt, "system_message": "You are a practical application specialist."})
+                        ])
             
             elif analysis_type == "Mathematical Content":
                 # For math, get both the text and the image
@@ -196,15 +210,14 @@ def display_whiteboard():
                     
                     prompt = f"This is content from a mathematical whiteboard related to {subject_area}. The OCR extracted the following text (which may have errors with math symbols): {extracted_text}\n\nPlease interpret the mathematical content, identify all concepts present, correct any notation errors, and explain both the mathematical meaning and practical applications."
                     
-                    ai_analysis = get_ai_response(st.session_state.groq_client, prompt, system_message)
-                    st.subheader("Mathematical Interpretation")
-                    st.markdown(ai_analysis)
-                    
-                    # Add examples section
-                    st.subheader("Example Problems")
                     examples_prompt = f"Based on the mathematical concepts identified ({extracted_text}), provide 2-3 example problems with solutions that would help reinforce understanding of these concepts."
-                    examples = get_ai_response(st.session_state.groq_client, examples_prompt, "You are a mathematics educator.")
-                    st.markdown(examples)
+                    
+                    # The interpretation and the example problems are independent, so request them together
+                    display_concurrent_sections([
+                        ("Mathematical Interpretation", {"prompt": prompt, "system_message": system_message}),
+                        # Add examples section
+                        ("Example Problems", {"prompt": examples_prompt, "system_message": "You are a mathematics educator."})
+                    ])
             
             else:  # Diagram/Drawing
                 encoded_img = extract_math_from_image(image_array)
@@ -233,10 +246,31 @@ def display_whiteboard():
                     
                     prompt = f"I've drawn a {diagram_type} related to {subject_area} on my study app whiteboard. Please help me understand how to make this visualization more effective and how it's used in real-world contexts."
                     
-                    ai_analysis = get_ai_response(st.session_state.groq_client, prompt, system_message)
+                    resources_prompt = f"Based on this {diagram_type} related to {subject_area}, suggest learning resources (categories of books, online courses, or tools - not specific titles) that would help the user deepen their understanding of these concepts."
+                    
                     st.subheader("Diagram Analysis")
-                    st.markdown(ai_analysis)
+                    analysis_placeholder = st.empty()
+                    analysis_placeholder.caption("Generating...")
+                    
+                    # Reserve the resources section below the custom feedback form; both
+                    # sections are requested together and fill in as each completes
+                    feedback_area = st.container()
+                    
+                    # Add a section for related resources
+                    st.subheader("Learning Resources")
+                    resources_placeholder = st.empty()
+                    resources_placeholder.caption("Generating...")
                     
+                    placeholders = [analysis_placeholder, resources_placeholder]
+                    fan_out_ai_responses(
+                        [
+                            {"prompt": prompt, "system_message": system_message},
+                            {"prompt": resources_prompt, "system_message": "You are an educational resource specialist."}
+                        ],
+                        lambda index, response: show_ai_result(response, placeholders[index])
+                    )
+                    
+                with feedback_area:
                     st.info("For more accurate diagram analysis, describe your diagram below.")
                     user_description = st.text_area("Describe your diagram to get better AI feedback:", height=100)
                     
@@ -253,12 +287,7 @@ def display_whiteboard():
                             6. Related concepts that could be incorporated
                             """
                             
-                            custom_feedback = get_ai_response(st.session_state.groq_client, custom_prompt, custom_system)
+                            custom_feedback = get_ai_response(get_groq_client(), custom_prompt, custom_system)
                             st.subheader("Custom Diagram Analysis")
-                            st.markdown(custom_feedback)
-                            
-                # Add a section for related resources
-                st.subheader("Learning Resources")
-                resources_prompt = f"Based on this {diagram_type} related to {subject_area}, suggest learning resources (categories of books, online courses, or tools - not specific titles) that would help the user deepen their understanding of these concepts."
-                resources = get_ai_response(st.session_state.groq_client, resources_prompt, "You are an educational resource specialist.")
-                st.markdown(resources)
+                            show_ai_result(custom_feedback)
+